@@ -0,0 +1,8 @@
+class Import(object):
+    """ Import time of the headless core and of the full interface, each in a fresh interpreter """
+
+    def timeraw_import_mesh(self):
+        return 'import genesis.mesh'
+
+    def timeraw_import_model(self):
+        return 'import genesis.model'
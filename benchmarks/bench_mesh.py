@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+
+from genesis.mesh import Unstructured2D
+from .synthetic import SIZES, make_mesh
+
+
+class MeshIO(object):
+    """ Reading and writing meshes in the ASCII 2DM and binary formats """
+    params = SIZES
+    param_names = ['elements']
+    timeout = 1200
+
+    def setup_cache(self):
+        # the files of every size are written once and shared by all of the benchmarks
+        paths = {}
+        for num_elements in SIZES:
+            mesh = make_mesh(num_elements)
+            paths[num_elements] = ('mesh_{}.2dm'.format(num_elements), 'mesh_{}.genesis'.format(num_elements))
+            mesh.write(os.path.abspath(paths[num_elements][0]))
+            mesh.write(os.path.abspath(paths[num_elements][1]))
+        return {key: tuple(os.path.abspath(p) for p in value) for key, value in paths.items()}
+
+    def setup(self, paths, num_elements):
+        self.directory = tempfile.mkdtemp()
+        self.mesh = Unstructured2D()
+        self.mesh.read(paths[num_elements][1], mmap=False)
+
+    def teardown(self, paths, num_elements):
+        shutil.rmtree(self.directory)
+
+    def time_read_ascii(self, paths, num_elements):
+        Unstructured2D().read(paths[num_elements][0], cache=False)
+
+    def time_read_binary(self, paths, num_elements):
+        Unstructured2D().read(paths[num_elements][1], mmap=False)
+
+    def time_read_binary_mmap(self, paths, num_elements):
+        Unstructured2D().read(paths[num_elements][1], mmap=True)
+
+    def time_write_ascii(self, paths, num_elements):
+        self.mesh.write(os.path.join(self.directory, 'mesh.2dm'))
+
+    def time_write_binary(self, paths, num_elements):
+        self.mesh.write(os.path.join(self.directory, 'mesh.genesis'))
+
+    def peakmem_read_ascii(self, paths, num_elements):
+        Unstructured2D().read(paths[num_elements][0], cache=False)
+
+    def peakmem_read_binary_mmap(self, paths, num_elements):
+        Unstructured2D().read(paths[num_elements][1], mmap=True)
+
+
+class MeshViews(object):
+    """ Aggregation of the element wireframe and elevation views """
+    params = SIZES
+    param_names = ['elements']
+    timeout = 1200
+
+    def setup(self, num_elements):
+        # compile the datashader aggregation functions before timing
+        warm = make_mesh(100, elevation_toggle=True)
+        warm.view_elements()[()]
+        warm.view_elevation()[()]
+        self.mesh = make_mesh(num_elements, elevation_toggle=True)
+        x0, y0, _ = self.mesh.coords.min(axis=1)
+        x1, y1, _ = self.mesh.coords.max(axis=1)
+        self.zoom = dict(x_range=(x0, x0 + (x1 - x0) / 10), y_range=(y0, y0 + (y1 - y0) / 10), width=800, height=800)
+
+    def time_view_elements(self, num_elements):
+        self.mesh.view_elements()[()]
+
+    def time_view_elevation(self, num_elements):
+        self.mesh.view_elevation()[()]
+
+    def time_rasterize_zoomed(self, num_elements):
+        self.mesh.rasterize_values(**self.zoom)
+
+    def time_rasterize_level_of_detail(self, num_elements):
+        self.mesh.level_of_detail = True
+        self.mesh.rasterize_values(width=800, height=800)
+
+    def peakmem_view_elements(self, num_elements):
+        self.mesh.view_elements()[()]
+
+    def peakmem_view_elevation(self, num_elements):
+        self.mesh.view_elevation()[()]
+
+
+class MeshTopology(object):
+    """ Topology, quality metrics and full validation """
+    params = SIZES
+    param_names = ['elements']
+    timeout = 600
+
+    def setup(self, num_elements):
+        self.mesh = make_mesh(num_elements)
+
+    def time_validate(self, num_elements):
+        self.mesh.clear_cache()
+        self.mesh.validate()
+
+    def time_boundary_loops(self, num_elements):
+        self.mesh.clear_cache()
+        self.mesh.boundary_loops()
+
+    def time_node_elements(self, num_elements):
+        self.mesh.clear_cache()
+        self.mesh.node_elements()
+
+    def peakmem_validate(self, num_elements):
+        self.mesh.clear_cache()
+        self.mesh.validate()
@@ -0,0 +1,49 @@
+import numpy as np
+
+from genesis.sampling import path_stations, sample_grid
+from .synthetic import SIZES, make_mesh
+
+PATHS = [np.array([[1000.0, 1000.0], [99000.0, 99000.0]]),
+         np.array([[1000.0, 50000.0], [50000.0, 1000.0], [99000.0, 50000.0]])]
+
+
+class CrossSection(object):
+    """ Sampling of cross-sections through the mesh """
+    params = [SIZES[:3], ['nearest', 'linear', 'barycentric']]
+    param_names = ['elements', 'method']
+    timeout = 600
+
+    def setup(self, num_elements, method):
+        self.mesh = make_mesh(num_elements)
+        self.mesh.element_index()
+        if method != 'barycentric':
+            # the grid methods sample the rasterized mesh, as the Model does
+            image = self.mesh.rasterize_values(width=500, height=500)
+            self.grid = (image.dimension_values(0, expanded=False), image.dimension_values(1, expanded=False),
+                         image.dimension_values(2, flat=False))
+
+    def time_sample_mesh(self, num_elements, method):
+        xs, ys, distance, offsets = path_stations(PATHS, 100)
+        if method == 'barycentric':
+            self.mesh.sample(xs, ys)
+        else:
+            sample_grid(*self.grid, xs, ys, method=method)
+
+
+class ModelCrossSection(object):
+    """ Cross-sections drawn on the Model, including the rasterization of the mesh """
+    params = [SIZES[:3], ['nearest', 'linear', 'barycentric']]
+    param_names = ['elements', 'method']
+    timeout = 600
+
+    def setup(self, num_elements, method):
+        try:
+            from genesis.model import Model
+        except ImportError:
+            raise NotImplementedError('genesis.model is not importable')
+        self.model = Model(sample_method=method, resolution=100)
+        self.model.polys = self.model.polys.clone(PATHS)
+        self.tri_mesh = make_mesh(num_elements).get_tri_mesh()
+
+    def time_model_sample(self, num_elements, method):
+        self.model._sample(self.tri_mesh, None)
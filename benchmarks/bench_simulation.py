@@ -0,0 +1,55 @@
+import numpy as np
+
+from genesis.mesh import Simulation
+from .synthetic import SIZES, grid_arrays, make_mesh, make_result
+
+
+class SetResult(object):
+    """ Loading results into a Simulation and reading them back """
+    params = SIZES
+    param_names = ['elements']
+    timeout = 600
+
+    def setup(self, num_elements):
+        coords, _ = grid_arrays(num_elements)
+        self.result = make_result(coords.shape[1])
+        self.sim = Simulation()
+        self.sim.set_result(self.result)
+
+    def time_set_result(self, num_elements):
+        Simulation().set_result(self.result)
+
+    def time_set_result_lazy(self, num_elements):
+        Simulation(lazy=True).set_result(self.result)
+
+    def time_get_result_magnitude(self, num_elements):
+        # computes the magnitude of one time step from its components, the derived cache being cleared
+        self.sim._derived_cache.clear()
+        self.sim.get_result('Velocity Magnitude', 5.0)
+
+    def time_compute_statistics(self, num_elements):
+        self.sim._statistics = {}
+        self.sim.compute_statistics(['Depth'])
+
+    def peakmem_set_result(self, num_elements):
+        Simulation().set_result(self.result)
+
+
+class Probe(object):
+    """ Time series extraction at gauge stations """
+    params = [SIZES[:3], [10, 1000]]
+    param_names = ['elements', 'stations']
+    timeout = 600
+
+    def setup(self, num_elements, num_stations):
+        self.mesh = make_mesh(num_elements)
+        self.sim = Simulation()
+        self.sim.set_result(make_result(self.mesh.coords.shape[1], num_times=100))
+        rng = np.random.RandomState(1)
+        self.x, self.y = rng.uniform(0, 100000, (2, num_stations))
+
+    def time_probe(self, num_elements, num_stations):
+        self.sim.probe(self.mesh, self.x, self.y, 'Depth')
+
+    def time_probe_derived(self, num_elements, num_stations):
+        self.sim.probe(self.mesh, self.x, self.y, 'Velocity Magnitude')
@@ -0,0 +1,50 @@
+"""
+Synthetic meshes and results used by the benchmarks.
+"""
+
+import numpy as np
+import xarray as xr
+
+from genesis.mesh import Unstructured2D
+
+# number of elements of the benchmarked meshes
+SIZES = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+
+def grid_arrays(num_elements, extent=100000.0, seed=0):
+    """
+    Triangulated square grid of about num_elements elements over an extent in
+    meters, with jittered interior nodes and a smooth synthetic bathymetry.
+    Returns the (3, n) coordinates and the (m, 3) int32 connectivity.
+    """
+    cells = max(int(np.sqrt(num_elements / 2.0)), 1)
+    nodes = cells + 1
+    spacing = extent / cells
+    x, y = [a.ravel() for a in np.meshgrid(np.arange(nodes) * spacing, np.arange(nodes) * spacing)]
+    interior = (x > 0) & (x < extent) & (y > 0) & (y < extent)
+    jitter = np.random.RandomState(seed).uniform(-0.25, 0.25, (2, interior.sum())) * spacing
+    x[interior] += jitter[0]
+    y[interior] += jitter[1]
+    z = -10 - 20 * np.sin(x / extent * np.pi) * np.cos(y / extent * np.pi)
+
+    i, j = [a.ravel() for a in np.meshgrid(np.arange(cells), np.arange(cells))]
+    corner = (j * nodes + i).astype(np.int32)
+    elements = np.concatenate([np.column_stack([corner, corner + 1, corner + nodes]),
+                               np.column_stack([corner + 1, corner + nodes + 1, corner + nodes])])
+    return np.vstack([x, y, z]), elements
+
+
+def make_mesh(num_elements, **params):
+    mesh = Unstructured2D(**params)
+    mesh.set_arrays(*grid_arrays(num_elements))
+    return mesh
+
+
+def make_result(num_nodes, num_times=10, seed=0):
+    """ Result Dataset with a scalar Depth and a vector Velocity over all nodes and times """
+    rng = np.random.RandomState(seed)
+    return xr.Dataset(
+        {'Depth': (('times', 'nodes_ids'), rng.rand(num_times, num_nodes), {'BEGSCL': ''}),
+         'Velocity': (('times', 'nodes_ids', 'vec'), rng.rand(num_times, num_nodes, 2), {'BEGVEC': '', 'DIM': 2})},
+        coords={'times': np.arange(num_times, dtype=float), 'nodes_ids': np.arange(num_nodes)},
+        attrs={'project_name': 'benchmark'})
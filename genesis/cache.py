@@ -0,0 +1,106 @@
+"""
+Caching of rasterized mesh aggregates.
+"""
+
+import os
+import pickle
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+log = logging.getLogger('genesis')
+
+
+def key_digest(key):
+    """ Stable digest of a cache key, used to name the spilled files """
+    return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+
+class RasterCache(object):
+    """
+    Least recently used cache of rasterized aggregates keyed by tuples such as
+    (mesh hash, variable, time, x_range, y_range, width, height). Entries evicted
+    from memory are spilled to disk when a directory is set, and read back
+    from there on later requests.
+    """
+    def __init__(self, max_items=64, directory=None):
+        self.max_items = max_items
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items or (self.directory is not None and os.path.isfile(self._path(key)))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key_digest(key) + '.pkl')
+
+    def get(self, key):
+        """ Returns the cached value of the key, or None on a miss """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        value = self._load(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """ Stores the value, evicting (and spilling) the least recently used entries """
+        evicted = []
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                evicted.append(self._items.popitem(last=False))
+        for item in evicted:
+            self._spill(*item)
+
+    def _spill(self, key, value):
+        if self.directory is None or os.path.isfile(self._path(key)):
+            return
+        try:
+            with open(self._path(key), 'wb') as f:
+                pickle.dump((key, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+        except (IOError, OSError, pickle.PicklingError) as e:
+            log.warning('Unable to spill raster to disk: {}'.format(e))
+
+    def _load(self, key):
+        if self.directory is None or not os.path.isfile(self._path(key)):
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                stored_key, value = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError) as e:
+            log.warning('Unable to read spilled raster: {}'.format(e))
+            return None
+        return value if stored_key == key else None
+
+    def clear(self, disk=False):
+        """ Empties the in-memory cache, and the spilled files if disk is set """
+        with self._lock:
+            self._items.clear()
+        if disk and self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def stats(self):
+        """ Returns the hit and miss counters of the cache """
+        return {'hits': self.hits, 'misses': self.misses, 'disk_hits': self.disk_hits, 'items': len(self._items)}
@@ -0,0 +1,70 @@
+"""
+Variables derived on demand from the results of a Simulation.
+
+Derived functions are vectorized expressions over the node values of their
+input variables. They are evaluated either on the numpy arrays of a single
+time slice or on the lazy dask arrays spanning all times, so they should only
+index the trailing dimensions (e.g. vector[..., 0]).
+"""
+
+import numpy as np
+
+
+def magnitude(vector):
+    return np.sqrt(vector[..., 0] ** 2 + vector[..., 1] ** 2)
+
+
+def direction(vector):
+    """ Direction of a vector in degrees counter-clockwise from the x axis """
+    return np.degrees(np.arctan2(vector[..., 1], vector[..., 0]))
+
+
+def speed_squared(vector):
+    return vector[..., 0] ** 2 + vector[..., 1] ** 2
+
+
+def threshold(value):
+    """ Returns a function flagging the node values above value with 1 and the rest with 0 (e.g. wet/dry) """
+    def above(values):
+        return (values > value) * 1.0
+    return above
+
+
+class DerivedVariable(object):
+    """ A result variable computed on demand from the input variables of a Simulation """
+    def __init__(self, name, func, inputs, attrs=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.attrs = dict(attrs or {})
+
+    def evaluate(self, sim, time):
+        """ Evaluates the variable for a single time, returning the node values """
+        return self.func(*[sim.get_result(label, time) for label in self.inputs])
+
+    def lazy(self, sim):
+        """ Returns the variable for all times as a lazy dask array """
+        return self.func(*[sim.lazy_data(label) for label in self.inputs])
+
+    def read_block(self, sim, times, nodes=slice(None)):
+        """ Evaluates the variable for a slice of times (and optionally a subset of nodes) """
+        return self.func(*[sim._read_block(label, times, nodes) for label in self.inputs])
+
+
+class Difference(DerivedVariable):
+    """ Difference between a result variable of a Simulation and the same variable of another Simulation """
+    def __init__(self, name, label, other, attrs=None):
+        super(Difference, self).__init__(name, np.subtract, [label], attrs=attrs)
+        self.other = other
+
+    def evaluate(self, sim, time):
+        label = self.inputs[0]
+        return sim.get_result(label, time) - self.other.get_result(label, time)
+
+    def lazy(self, sim):
+        label = self.inputs[0]
+        return sim.lazy_data(label) - self.other.lazy_data(label)
+
+    def read_block(self, sim, times, nodes=slice(None)):
+        label = self.inputs[0]
+        return sim._read_block(label, times, nodes) - self.other._read_block(label, times, nodes)
@@ -0,0 +1,165 @@
+"""
+Concurrent execution of ensembles of simulations (e.g. parameter sweeps) on a shared mesh.
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import param
+
+from . import mesh_io
+from .mesh import Unstructured, Simulation
+
+log = logging.getLogger('genesis')
+
+# mesh of the current worker process and the (class, path) it was read from
+_worker_mesh = None
+_worker_key = None
+
+
+def _load_worker_mesh(mesh_class, mesh_path):
+    """
+    Builds the mesh of a worker process once, on its first simulation. The mesh
+    is memory-mapped from its binary file, so that all workers share the same
+    pages and only receive its path with every simulation.
+    """
+    global _worker_mesh, _worker_key
+    if _worker_key != (mesh_class, mesh_path):
+        mesh = mesh_class()
+        if mesh_path is not None:
+            mesh.read(mesh_path, mmap=True)
+        _worker_mesh, _worker_key = mesh, (mesh_class, mesh_path)
+    return _worker_mesh
+
+
+def _solve(mesh_class, mesh_path, sim):
+    """ Solves a simulation in a worker process, returning its result dataset """
+    result = sim.solve(_load_worker_mesh(mesh_class, mesh_path))
+    if result is None:
+        result = sim.xarr
+    return result
+
+
+class Ensemble(param.Parameterized):
+    """
+    Runs the solve method of many simulations in a pool of processes. The solve
+    method of each simulation is called with the mesh of the worker and returns
+    its result dataset (or sets it on the simulation), which is collected
+    through set_result on the simulation of the calling process.
+    """
+    simulations = param.List(default=[], item_type=Simulation)
+
+    mesh = param.ClassSelector(default=None, class_=Unstructured, allow_None=True)
+
+    mesh_path = param.String(default=None, allow_None=True, doc="""
+        Path of the mesh in the binary format, memory-mapped by every worker. When
+        not set, the mesh is written to a temporary binary file for each run.""")
+
+    max_workers = param.Integer(default=None, allow_None=True, bounds=(1, None), doc="""
+        Maximum number of simulations solved concurrently, defaults to the number of processors.""")
+
+    status_bar = param.Parameter(default=None, doc="""
+        StatusBar (ui_util.interface) reporting the progress of the ensemble.""")
+
+    runner = param.Parameter(default=None, doc="""
+        TaskRunner (ui_util.interface) solving the ensemble in the background in run_async.""")
+
+    def __init__(self, **params):
+        super(Ensemble, self).__init__(**params)
+        # exceptions raised by the simulations that failed, keyed by simulation id
+        self.failed = {}
+
+    def _mesh_args(self, directory):
+        """
+        Returns the mesh class and binary path read by the workers. Meshes without
+        a mesh_path are written once, with their name, units and projection, to
+        the temporary directory.
+        """
+        mesh_class = type(self.mesh) if self.mesh is not None else Unstructured
+        if self.mesh_path is not None or self.mesh is None:
+            return mesh_class, self.mesh_path
+        path = os.path.join(directory, 'mesh.genesis')
+        mesh_io.write_binary(path, self.mesh.coords, self.mesh.elements, self.mesh._metadata())
+        return mesh_class, path
+
+    def _set_msg(self, message):
+        log.info(message)
+        if self.status_bar is not None:
+            self.status_bar.set_msg(message)
+
+    def _solve_all(self, task=None):
+        """
+        Solves the simulations in the pool of processes, returning (simulation,
+        result, exception) for each of them in the order they completed. Progress
+        goes to the task when running on a TaskRunner, which can also cancel the
+        simulations not yet started.
+        """
+        outcomes = []
+        total = len(self.simulations)
+        directory = tempfile.mkdtemp(prefix='genesis-ensemble-')
+        try:
+            mesh_args = self._mesh_args(directory)
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(_solve, *mesh_args, sim): sim for sim in self.simulations}
+                for future in as_completed(futures):
+                    try:
+                        outcomes.append((futures[future], future.result(), None))
+                    except Exception as e:
+                        outcomes.append((futures[future], None, e))
+                    message = 'Solved {}/{} simulations'.format(len(outcomes), total)
+                    if task is None:
+                        self._set_msg(message)
+                        continue
+                    task.report(len(outcomes) / float(total), message)
+                    if task.cancelled:
+                        for pending in futures:
+                            pending.cancel()
+                        break
+        finally:
+            # the workers have exited, so the mesh is no longer mapped
+            shutil.rmtree(directory, ignore_errors=True)
+        return outcomes
+
+    def _collect(self, outcomes):
+        """ Sets the results on the simulations, returning those that completed """
+        self.failed = {}
+        done = set()
+        for sim, result, error in outcomes:
+            if error is None:
+                try:
+                    sim.set_result(result)
+                except Exception as e:
+                    error = e
+            if error is not None:
+                # raised by the solve in the worker or by setting its result here
+                log.error('Simulation {} ({}) failed: {}'.format(sim.sim_name, sim.id, error))
+                self.failed[sim.id] = error
+            else:
+                done.add(sim.id)
+        self._set_msg('Solved {}/{} simulations ({} failed)'.format(
+            len(done) + len(self.failed), len(self.simulations), len(self.failed)))
+        # keep the order of the simulations
+        return [sim for sim in self.simulations if sim.id in done]
+
+    def run(self):
+        """ Solves all the simulations, returning those that completed """
+        self._set_msg('Solving {} simulations ... '.format(len(self.simulations)))
+        return self._collect(self._solve_all())
+
+    def run_async(self, callback=None):
+        """
+        Solves all the simulations on the runner. Their results are set on the
+        next tick of the calling document once all are solved, or once the task
+        is cancelled for the simulations solved so far, after which callback
+        receives the simulations that completed. Returns the Task.
+        """
+        def collect(outcomes):
+            solved = self._collect(outcomes)
+            if callback is not None:
+                callback(solved)
+        self.failed = {}
+        return self.runner.submit(self._solve_all, callback=collect, cancel_callback=collect,
+                                  message='Solving {} simulations ... '.format(len(self.simulations)))
@@ -0,0 +1,219 @@
+"""
+Opt-in instrumentation of the hot paths of genesis: named timing spans,
+counters and memory snapshots, logged to the 'genesis' logger and collected
+into an in-process report. When disabled, instrumented functions only pay
+for a single attribute check.
+
+Instrumentation is enabled with instrumentation.enable(), or at import by
+setting the GENESIS_INSTRUMENT environment variable (to 'memory' to also
+trace memory allocations with tracemalloc).
+"""
+
+import os
+import time
+import logging
+import threading
+import functools
+import tracemalloc
+
+log = logging.getLogger('genesis')
+
+
+class _SpanStats(object):
+    __slots__ = ('count', 'total', 'max', 'memory')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # net memory allocated within the span, when tracing memory
+        self.memory = 0
+
+
+class _Span(object):
+    """ Context manager timing a block of code """
+    __slots__ = ('instrumentation', 'name', 'start', 'memory')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.memory = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        memory = None
+        if self.memory is not None and tracemalloc.is_tracing():
+            memory = tracemalloc.get_traced_memory()[0] - self.memory
+        self.instrumentation._record(self.name, elapsed, memory)
+        return False
+
+
+class _NullSpan(object):
+    """ Context manager doing nothing, returned by span when instrumentation is disabled """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+class Instrumentation(object):
+    """
+    Collects timing spans, counters and memory snapshots. Spans and counters are
+    aggregated by name (count, total, mean and max durations), snapshots keep the
+    current and peak traced memory at labelled points. Thread safe.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self.reset()
+
+    def enable(self, memory=False):
+        """ Enables the instrumentation, tracing memory allocations with tracemalloc when memory is set """
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        """ Disables the instrumentation, stopping tracemalloc if it was started by enable """
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        """ Clears all of the collected spans, counters and snapshots """
+        with self._lock:
+            self.spans = {}
+            self.counters = {}
+            self.snapshots = []
+
+    def span(self, name):
+        """ Returns a context manager timing the enclosed block under the given name """
+        if not self.enabled:
+            return _null_span
+        return _Span(self, name)
+
+    def _record(self, name, elapsed, memory=None):
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = _SpanStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            if memory is not None:
+                stats.memory += memory
+        if log.isEnabledFor(logging.DEBUG):
+            if memory is None:
+                log.debug('{} took {:.4f} s'.format(name, elapsed))
+            else:
+                log.debug('{} took {:.4f} s, allocated {:.1f} KiB'.format(name, elapsed, memory / 1024.0))
+
+    def count(self, name, value=1):
+        """ Increments the counter of the given name """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self, label, top=0):
+        """
+        Records the current and peak memory traced by tracemalloc, along with the
+        top source lines by allocated size when top is set. Does nothing unless
+        memory is traced.
+        """
+        if not self.enabled or not tracemalloc.is_tracing():
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = {'label': label, 'time': time.time(), 'current': current, 'peak': peak}
+        if top:
+            statistics = tracemalloc.take_snapshot().statistics('lineno')[:top]
+            snapshot['top'] = [(str(stat.traceback[0]), stat.size) for stat in statistics]
+        with self._lock:
+            self.snapshots.append(snapshot)
+        log.debug('Memory at {}: {:.1f} MiB (peak {:.1f} MiB)'.format(label, current / 2.0 ** 20, peak / 2.0 ** 20))
+        return snapshot
+
+    def report(self):
+        """ Returns the collected spans, counters and snapshots as a dictionary """
+        with self._lock:
+            spans = {name: {'count': stats.count, 'total': stats.total, 'mean': stats.total / stats.count,
+                            'max': stats.max, 'memory': stats.memory}
+                     for name, stats in self.spans.items()}
+            return {'spans': spans, 'counters': dict(self.counters), 'snapshots': list(self.snapshots)}
+
+    def report_frame(self):
+        """ Returns the spans and counters as a DataFrame, the slowest spans first """
+        import pandas as pd
+        report = self.report()
+        rows = [dict(name=name, kind='span', **stats) for name, stats in
+                sorted(report['spans'].items(), key=lambda item: -item[1]['total'])]
+        rows += [{'name': name, 'kind': 'counter', 'count': value} for name, value in sorted(report['counters'].items())]
+        return pd.DataFrame(rows, columns=['name', 'kind', 'count', 'total', 'mean', 'max', 'memory'])
+
+    def format_report(self):
+        """ Returns the report as a text table """
+        report = self.report()
+        lines = ['{:<40} {:>8} {:>10} {:>10} {:>10} {:>12}'.format(
+            'span', 'count', 'total (s)', 'mean (ms)', 'max (ms)', 'memory (KiB)')]
+        for name, stats in sorted(report['spans'].items(), key=lambda item: -item[1]['total']):
+            lines.append('{:<40} {:>8} {:>10.4f} {:>10.3f} {:>10.3f} {:>12.1f}'.format(
+                name, stats['count'], stats['total'], 1000 * stats['mean'], 1000 * stats['max'],
+                stats['memory'] / 1024.0))
+        for name, value in sorted(report['counters'].items()):
+            lines.append('{:<40} {:>8}'.format(name, value))
+        for snapshot in report['snapshots']:
+            lines.append('{:<40} {:>8.1f} MiB (peak {:.1f} MiB)'.format(
+                snapshot['label'], snapshot['current'] / 2.0 ** 20, snapshot['peak'] / 2.0 ** 20))
+        return '\n'.join(lines)
+
+    def log_report(self, level=logging.INFO):
+        """ Logs the report to the 'genesis' logger """
+        log.log(level, 'Instrumentation report\n' + self.format_report())
+
+
+# instrumentation shared by the whole process
+instrumentation = Instrumentation()
+
+if os.environ.get('GENESIS_INSTRUMENT'):
+    instrumentation.enable(memory=os.environ['GENESIS_INSTRUMENT'].lower() == 'memory')
+
+
+def span(name):
+    """ Context manager timing the enclosed block under the given name """
+    return instrumentation.span(name)
+
+
+def count(name, value=1):
+    """ Increments the counter of the given name """
+    instrumentation.count(name, value)
+
+
+def snapshot(label, top=0):
+    """ Records the current and peak traced memory under the given label """
+    return instrumentation.snapshot(label, top)
+
+
+def timed(name):
+    """ Decorator timing every call of a function as a span of the given name """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return func(*args, **kwargs)
+            with _Span(instrumentation, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,131 @@
+"""
+Interpolation of scattered points and rasters onto the nodes of a mesh.
+
+Target points are processed in chunks on a pool of threads, the heavy lifting
+(KD-tree queries, simplex searches and numpy arithmetic) releases the GIL so
+the chunks run on all cores.
+"""
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy.spatial import cKDTree, Delaunay
+
+from .spatial import ElementIndex
+
+
+def _chunked(func, num, chunk_size, max_workers=None):
+    """ Evaluates func(slice) for consecutive chunks of num points on a thread pool, concatenating the results """
+    chunks = [slice(start, min(start + chunk_size, num)) for start in range(0, num, chunk_size)]
+    if len(chunks) <= 1:
+        return func(slice(0, num))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return np.concatenate(list(executor.map(func, chunks)))
+
+
+def nearest(x, y, values, px, py, chunk_size=2 ** 16, max_workers=None):
+    """ Values of the nearest scattered point (x, y) at each of the points (px, py) """
+    tree = cKDTree(np.column_stack([x, y]), balanced_tree=False)
+    values = np.asarray(values)
+    points = np.column_stack([px, py])
+
+    def chunk(s):
+        _, nodes = tree.query(points[s], k=1)
+        return values[nodes]
+    return _chunked(chunk, len(points), chunk_size, max_workers)
+
+
+def idw(x, y, values, px, py, k=8, power=2, chunk_size=2 ** 16, max_workers=None):
+    """
+    Inverse distance weighting of the k nearest scattered points (x, y) at each
+    of the points (px, py). Points coinciding with a scattered point take its value.
+    """
+    tree = cKDTree(np.column_stack([x, y]), balanced_tree=False)
+    values = np.asarray(values, dtype=np.float64)
+    points = np.column_stack([px, py])
+    k = min(k, len(values))
+
+    def chunk(s):
+        distance, nodes = tree.query(points[s], k=k)
+        distance, nodes = distance.reshape(len(distance), k), nodes.reshape(len(nodes), k)
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / distance ** power
+        exact = np.isinf(weights)
+        # exact hits get all of the weight
+        weights[exact.any(axis=1)] = exact[exact.any(axis=1)]
+        return (weights * values[nodes]).sum(axis=1) / weights.sum(axis=1)
+    return _chunked(chunk, len(points), chunk_size, max_workers)
+
+
+def linear(x, y, values, px, py, fill_value=np.nan, chunk_size=2 ** 16, max_workers=None):
+    """
+    Linear interpolation over the Delaunay triangulation of the scattered points
+    (x, y). The points (px, py) are located in the triangulation with an
+    ElementIndex, which is much faster than walking the triangulation for large
+    batches. Points outside of the convex hull are set to fill_value.
+    """
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    index = ElementIndex(x, y, Delaunay(np.column_stack([x, y])).simplices, chunk_size=chunk_size)
+    px, py = np.asarray(px, dtype=np.float64), np.asarray(py, dtype=np.float64)
+
+    def chunk(s):
+        elements, weights = index.locate(px[s], py[s])
+        result = index.interpolate_located(values, elements, weights)
+        result[elements < 0] = fill_value
+        return result
+    return _chunked(chunk, len(px), chunk_size, max_workers)
+
+
+def _read_window(raster, rows, cols):
+    """ Reads a window of a (y, x) raster, an xarray DataArray or any array supporting slicing (e.g. np.memmap) """
+    if hasattr(raster, 'isel'):
+        return np.asarray(raster.isel({raster.dims[0]: rows, raster.dims[1]: cols}).values, dtype=np.float64)
+    return np.asarray(raster[rows, cols], dtype=np.float64)
+
+
+def bilinear(xc, yc, raster, px, py, chunk_size=2 ** 16, max_workers=None):
+    """
+    Bilinear sampling of a regular (y, x) raster with pixel center coordinates xc
+    and yc, ascending or descending, at the points (px, py). The points are sorted
+    along y and only the window of rows and columns covering each chunk is read,
+    so memory-mapped or lazily loaded rasters are never loaded in full. Points
+    outside of the raster are NaN.
+    """
+    xc, yc = np.asarray(xc, dtype=np.float64), np.asarray(yc, dtype=np.float64)
+    px, py = np.asarray(px, dtype=np.float64), np.asarray(py, dtype=np.float64)
+    # fractional pixel positions of the points
+    fx = (px - xc[0]) / (xc[-1] - xc[0]) * (len(xc) - 1) if len(xc) > 1 else np.zeros(len(px))
+    fy = (py - yc[0]) / (yc[-1] - yc[0]) * (len(yc) - 1) if len(yc) > 1 else np.zeros(len(py))
+    order = np.argsort(fy, kind='stable')
+    fx, fy = fx[order], fy[order]
+
+    def chunk(s):
+        cx, cy = fx[s], fy[s]
+        result = np.full(len(cx), np.nan)
+        valid = (cx >= 0) & (cx <= len(xc) - 1) & (cy >= 0) & (cy <= len(yc) - 1)
+        if not valid.any():
+            return result
+        cx, cy = cx[valid], cy[valid]
+        c0 = np.minimum(np.floor(cx).astype(np.int64), max(len(xc) - 2, 0))
+        r0 = np.minimum(np.floor(cy).astype(np.int64), max(len(yc) - 2, 0))
+        c1 = np.minimum(c0 + 1, len(xc) - 1)
+        r1 = np.minimum(r0 + 1, len(yc) - 1)
+        cmin, rmin = c0.min(), r0.min()
+        window = _read_window(raster, slice(rmin, r1.max() + 1), slice(cmin, c1.max() + 1))
+        c0, c1, r0, r1 = c0 - cmin, c1 - cmin, r0 - rmin, r1 - rmin
+        wx, wy = cx - cmin - c0, cy - rmin - r0
+        top = window[r0, c0] * (1 - wx) + window[r0, c1] * wx
+        bottom = window[r1, c0] * (1 - wx) + window[r1, c1] * wx
+        result[valid] = top * (1 - wy) + bottom * wy
+        return result
+
+    values = np.empty(len(px))
+    values[order] = _chunked(chunk, len(px), chunk_size, max_workers)
+    return values
+
+
+def interpolate(x, y, values, px, py, method='linear', **kwargs):
+    """ Interpolates the scattered points (x, y) at the points (px, py) with the nearest, idw or linear method """
+    methods = {'nearest': nearest, 'idw': idw, 'linear': linear}
+    if method not in methods:
+        raise RuntimeError('Interpolation method {} not found.'.format(method))
+    return methods[method](x, y, values, px, py, **kwargs)
@@ -0,0 +1,72 @@
+"""
+Level-of-detail decimation of unstructured triangular meshes for interactive display.
+"""
+
+import numpy as np
+
+
+def cluster_mesh(x, y, z, elements, cell):
+    """
+    Decimates a triangular mesh by vertex clustering: nodes falling within the
+    same square cell of the given size are merged into their mean position and
+    value, collapsed and duplicate elements are dropped. Returns the x, y and z
+    arrays of the merged nodes along with the int32 connectivity.
+    """
+    ix = np.floor((x - x.min()) / cell).astype(np.int64)
+    iy = np.floor((y - y.min()) / cell).astype(np.int64)
+    clusters, inverse = np.unique(iy * (ix.max() + 1) + ix, return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse)
+    cx = np.bincount(inverse, weights=x) / counts
+    cy = np.bincount(inverse, weights=y) / counts
+    cz = np.bincount(inverse, weights=z) / counts
+
+    tris = inverse[elements]
+    keep = (tris[:, 0] != tris[:, 1]) & (tris[:, 1] != tris[:, 2]) & (tris[:, 0] != tris[:, 2])
+    tris = tris[keep]
+    # drop elements that collapsed onto the same three clusters, keeping their orientation
+    ordered = np.sort(tris, axis=1)
+    num = np.int64(len(clusters))
+    _, first = np.unique((ordered[:, 0] * num + ordered[:, 1]) * num + ordered[:, 2], return_index=True)
+    return cx, cy, cz, tris[np.sort(first)].astype(np.int32)
+
+
+class MeshPyramid(object):
+    """
+    Multi-resolution pyramid of a triangular mesh. Every level is decimated
+    from the previous one with a cell size twice as large, until the level
+    holds fewer than min_elements elements or stops shrinking.
+    """
+    def __init__(self, x, y, z, elements, min_elements=2 ** 16, max_levels=16):
+        self.levels = []
+        num = len(elements)
+        if num <= min_elements:
+            return
+        width, height = np.ptp(x), np.ptp(y)
+        # typical node spacing of the mesh
+        cell = 2 * np.sqrt(max(width * height, 1e-12) / max(len(x), 1))
+        while len(self.levels) < max_levels:
+            cx, cy, cz, coarse = cluster_mesh(x, y, z, elements, cell)
+            if len(coarse) > 0.9 * len(elements):
+                # the mesh is already coarser than the cells, try a larger cell size
+                cell *= 2
+                continue
+            self.levels.append((cell, cx, cy, cz, coarse))
+            x, y, z, elements = cx, cy, cz, coarse
+            if len(coarse) <= min_elements:
+                break
+            cell *= 2
+
+    def select(self, x_range, y_range, width, height):
+        """
+        Returns the index of the coarsest level whose cells are no larger than
+        a screen pixel of the given view, or -1 if the full mesh is required.
+        """
+        if None in (x_range, y_range, width, height) or not self.levels:
+            return -1
+        pixel = max((x_range[1] - x_range[0]) / max(width, 1), (y_range[1] - y_range[0]) / max(height, 1))
+        level = -1
+        for i, (cell, x, y, z, elements) in enumerate(self.levels):
+            if cell <= pixel:
+                level = i
+        return level
@@ -1,4 +1,6 @@
+import os
 import uuid
+import hashlib
 from collections import OrderedDict
 import numpy as np
 import pandas as pd
@@ -6,18 +8,45 @@ import xarray as xr
 import logging
 
 import param
-import holoviews as hv
-import geoviews as gv
-from holoviews.operation.datashader import datashade, rasterize
-import datashader as ds
-from holoviews import opts
 
-from .util import Projection
+from .projection import Projection, get_transformer
+from .spatial import ElementIndex, NodeIndex, points_in_polygon
+from .topology import (unique_edges, edge_lines, node_elements, node_neighbours, element_neighbours,
+                       boundary_loops, element_quality, topology_problems)
+from .lod import MeshPyramid
+from .cache import RasterCache
+from .derived import DerivedVariable, Difference, magnitude
+from .statistics import StreamingHistogram
+from .instrument import timed, span, count
+from . import mesh_io
 
 
 log = logging.getLogger('genesis')
 
 
+# the plotting libraries (holoviews, geoviews, datashader) are only imported by
+# the view methods so that meshes and simulations can be used without them
+def _tri_mesh(x, y, values, elements, vdim='z'):
+    """ Builds a TriMesh over the given arrays without copying them """
+    import holoviews as hv
+    nodes = hv.Nodes((x, y, np.arange(len(x), dtype=np.int32), values), vdims=[vdim], datatype=['dictionary'])
+    simplices = {'v0': elements[:, 0], 'v1': elements[:, 1], 'v2': elements[:, 2]}
+    return hv.TriMesh((simplices, nodes), kdims=['v0', 'v1', 'v2'], datatype=['dictionary'])
+
+
+def _element_tri_mesh(x, y, elements, values, vdim):
+    """ Builds a TriMesh holding one value per element rather than per node """
+    import holoviews as hv
+    nodes = hv.Nodes((x, y, np.arange(len(x), dtype=np.int32)), datatype=['dictionary'])
+    simplices = {'v0': elements[:, 0], 'v1': elements[:, 1], 'v2': elements[:, 2], vdim: values}
+    return hv.TriMesh((simplices, nodes), kdims=['v0', 'v1', 'v2'], vdims=[vdim], datatype=['dictionary'])
+
+
+def _path(xs, ys):
+    import holoviews as hv
+    return hv.Path({'x': xs, 'y': ys}, datatype=['dictionary'])
+
+
 class Mesh(param.Parameterized):
     name = param.String(
         default='default_mesh',
@@ -41,20 +70,180 @@ class Unstructured(Mesh):
     tris = param.DataFrame(default=pd.DataFrame(data=[], columns=['v0', 'v1', 'v2']))
     verts = param.DataFrame(default=pd.DataFrame(data=[], columns=['x', 'y', 'z']))
 
-    mesh_points = param.ClassSelector(default=gv.Points([]), class_=gv.Points)
+    mesh_points = param.Parameter(default=None, doc="""
+        Points of the mesh nodes (geoviews Points).""")
 
     elements_toggle = param.Boolean(default=True, label='Elements', precedence=1)
 
     elevation_toggle = param.Boolean(default=False, label='Elevation', precedence=2)
 
+    quality_toggle = param.Boolean(default=False, label='Quality', precedence=3)
+
     def __init__(self, **params):
         super(Unstructured, self).__init__(**params)
+        # compact core representation of the mesh, verts and tris are zero-copy views of these
+        self._coords = np.empty((3, 0), dtype=np.float64)
+        self._elements = np.empty((0, 3), dtype=np.int32)
+        self._verts_view = None
+        self._tris_view = None
+        self._syncing = False
+        # derived data (indexes, element views, etc.) that is cleared whenever the mesh changes
+        self._cache = {}
+        self._sync_arrays()
+
+    @property
+    def coords(self):
+        """ Contiguous (3, n) float64 array of the node x, y and z coordinates """
+        return self._coords
+
+    @property
+    def elements(self):
+        """ Contiguous (m, 3) int32 array of the element connectivity """
+        return self._elements
+
+    def set_arrays(self, coords, elements):
+        """
+        Sets the mesh from a (3, n) array of node coordinates and an (m, 3)
+        array of element connectivity. Arrays that are already contiguous
+        float64/int32 (including memory-mapped arrays) are used without copying.
+        """
+        coords = np.ascontiguousarray(coords, dtype=np.float64)
+        elements = np.ascontiguousarray(elements, dtype=np.int32)
+        if coords.ndim != 2 or coords.shape[0] != 3:
+            raise RuntimeError('coords must have the shape (3, n)')
+        if elements.ndim != 2 or elements.shape[1] != 3:
+            raise RuntimeError('elements must have the shape (m, 3)')
+
+        self._coords = coords
+        self._elements = elements
+        self._verts_view = pd.DataFrame(coords.T, columns=['x', 'y', 'z'], copy=False)
+        self._tris_view = pd.DataFrame(elements, columns=['v0', 'v1', 'v2'], copy=False)
+        self.clear_cache()
+        self._syncing = True
+        try:
+            self.verts = self._verts_view
+            self.tris = self._tris_view
+        finally:
+            self._syncing = False
+
+    @param.depends('verts', 'tris', watch=True)
+    def _sync_arrays(self):
+        """ Rebuilds the compact arrays when verts or tris are replaced with new DataFrames """
+        if self._syncing or (self.verts is self._verts_view and self.tris is self._tris_view):
+            return
+        coords, elements = self._coords, self._elements
+        if self.verts is not self._verts_view:
+            if not {'x', 'y', 'z'}.issubset(self.verts.columns):
+                return  # left to validate()
+            coords = self.verts[['x', 'y', 'z']].to_numpy(dtype=np.float64).T
+        if self.tris is not self._tris_view:
+            if not {'v0', 'v1', 'v2'}.issubset(self.tris.columns):
+                return  # left to validate()
+            elements = self.tris[['v0', 'v1', 'v2']].to_numpy(dtype=np.int32)
+        self.set_arrays(coords, elements)
+
+    def clear_cache(self):
+        """ Clears all of the data derived from the mesh """
+        # a new dict rather than clearing it, as it may be shared with other meshes (see store.SharedStore)
+        self._cache = {}
+
+    def content_hash(self):
+        """ Digest of the node coordinates and connectivity, used to key data cached across meshes """
+        if 'content_hash' not in self._cache:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(self._coords.data)
+            digest.update(self._elements.data)
+            self._cache['content_hash'] = digest.hexdigest()
+        return self._cache['content_hash']
+
+    def projected_coords(self, crs):
+        """
+        Returns the x and y node coordinates projected to the given cartopy crs. The
+        projected arrays are cached until the mesh or its projection changes.
+        """
+        key = ('projected', self.projection.get_crs().proj4_init, crs.proj4_init)
+        if key not in self._cache:
+            with span('mesh.projected_coords'):
+                self._cache[key] = self.projection.transform(self._coords[0], self._coords[1], crs)
+        return self._cache[key]
+
+    def set_elevation(self, values):
+        """
+        Writes node values into the z coordinates of the mesh. Read-only (e.g.
+        memory-mapped) coordinates are copied first. Clears the derived data.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape != (self._coords.shape[1],):
+            raise RuntimeError('Elevation must have one value per node.')
+        if not self._coords.flags.writeable:
+            coords = self._coords.copy()
+            coords[2] = values
+            self.set_arrays(coords, self._elements)
+        else:
+            self._coords[2] = values
+            self.clear_cache()
+
+    @timed('mesh.read')
+    def read(self, path, cache=True, mmap=True):
+        """
+        Reads the mesh from an ASCII 2DM/3DM file or from a binary mesh directory.
+        When cache is set, ASCII files are converted once to a binary sidecar
+        (path + '.genesis') which is memory-mapped on subsequent reads.
+        """
+        meta = {}
+        if mesh_io.is_binary(path):
+            coords, elements, meta = mesh_io.read_binary(path, mmap=mmap)
+        else:
+            cached = mesh_io.read_cached(path) if cache else None
+            if cached is not None:
+                log.debug('Reading mesh from cache {}'.format(mesh_io.cache_path(path)))
+                coords, elements, meta = cached
+            else:
+                coords, elements = mesh_io.read_ascii(path)
+                if cache:
+                    try:
+                        mesh_io.write_binary(mesh_io.cache_path(path), coords, elements,
+                                             mesh_io.source_stamp(path))
+                    except (IOError, OSError) as e:
+                        log.warning('Unable to write mesh cache for {}: {}'.format(path, e))
+        self.set_arrays(coords, elements)
+        self._set_metadata(meta)
+
+    @timed('mesh.write')
+    def write(self, path):
+        """ Writes the mesh to an ASCII 2DM/3DM file or, for any other path, to a binary mesh directory """
+        if os.path.splitext(path)[1].lower() in mesh_io.ASCII_EXTENSIONS:
+            mesh_io.write_ascii(path, self._coords, self._elements, name=self.name)
+        else:
+            mesh_io.write_binary(path, self._coords, self._elements, self._metadata())
+
+    def _metadata(self):
+        """ The name, units and projection of the mesh, as stored in binary mesh files """
+        return {'name': self.name, 'units': self.units,
+                'projection': {'crs_label': self.projection.crs_label,
+                               'UTM_zone_hemi': self.projection.UTM_zone_hemi,
+                               'UTM_zone_num': self.projection.UTM_zone_num}}
+
+    def _set_metadata(self, meta):
+        if 'name' in meta:
+            with param.edit_constant(self):
+                self.name = meta['name']
+        if 'units' in meta:
+            self.units = meta['units']
+        if 'projection' in meta:
+            self.projection.set_constant(value=False)
+            for key in ['UTM_zone_hemi', 'UTM_zone_num', 'crs_label']:
+                setattr(self.projection, key, meta['projection'][key])
 
     def validate(self):
         if list(self.tris.columns) != ['v0', 'v1', 'v2']:
             raise RuntimeError('tris columns not set properly')
         if list(self.verts.columns) != ['x', 'y', 'z']:
             raise RuntimeError('verts columns not set properly')
+        if not np.isfinite(self._coords[:2]).all():
+            raise RuntimeError('verts contain non-finite coordinates')
+        if len(self._elements) and (self._elements.min() < 0 or self._elements.max() >= self._coords.shape[1]):
+            raise RuntimeError('tris reference nodes that do not exist')
 
     @param.depends('elements_toggle', watch=True)
     def view_elements(self):
@@ -66,39 +255,509 @@ class Unstructured(Mesh):
         """ Method to display the mesh as continuous color contours"""
         raise ChildProcessError('view elevation method not set')
 
+    @param.depends('quality_toggle', watch=True)
+    def view_quality(self):
+        """ Method to display the quality metric of the elements as a rasterized map"""
+        raise ChildProcessError('view quality method not set')
+
     def view_mesh(self):
         raise ChildProcessError('view mesh method not set')
 
 
 class Unstructured2D(Unstructured):
-    tri_mesh = param.ClassSelector(default=hv.TriMesh(data=()), class_=hv.TriMesh)
+    tri_mesh = param.Parameter(default=None, doc="""
+        TriMesh displayed for the mesh, built from the mesh arrays when not set.""")
+
+    level_of_detail = param.Boolean(default=False, precedence=-1, doc="""
+        Display a decimated level of the mesh pyramid chosen from the current
+        viewport, instead of the full resolution mesh.""")
+
+    raster_cache = param.ClassSelector(default=None, class_=RasterCache, precedence=-1, doc="""
+        Cache of rasterized views. When set, repeated views of the same variable,
+        time and extent are served from the cache instead of being re-aggregated.""")
+
+    quality_metric = param.ObjectSelector(default='min_angle', objects=['area', 'aspect_ratio', 'min_angle'],
+                                          label='Quality metric', precedence=4, doc="""
+        Element quality metric displayed by view_quality.""")
 
     def __init__(self, **params):
         super(Unstructured2D, self).__init__(**params)
 
+    def get_tri_mesh(self):
+        """
+        Returns the TriMesh of the mesh. Unless tri_mesh has been set explicitly
+        it is built lazily from the compact arrays without copying them.
+        """
+        if self.tri_mesh is not None and len(self.tri_mesh):
+            return self.tri_mesh
+        if 'tri_mesh' not in self._cache:
+            with span('mesh.tri_mesh'):
+                x, y, z = self._coords
+                self._cache['tri_mesh'] = _tri_mesh(x, y, z, self._elements)
+        return self._cache['tri_mesh']
+
+    @timed('mesh.get_projected_tri_mesh')
+    def get_projected_tri_mesh(self, crs=None):
+        """
+        Returns a geoviews TriMesh of the mesh whose nodes are already projected to
+        the given crs (Web Mercator by default), so that displays in that crs never
+        reproject the nodes again.
+        """
+        import geoviews as gv
+        if crs is None:
+            import cartopy.crs as ccrs
+            crs = ccrs.GOOGLE_MERCATOR
+        key = ('projected_tri_mesh', self.projection.get_crs().proj4_init, crs.proj4_init)
+        if key not in self._cache:
+            x, y = self.projected_coords(crs)
+            nodes = gv.Nodes((x, y, np.arange(len(x), dtype=np.int32), self._coords[2]), vdims=['z'],
+                             crs=crs, datatype=['dictionary'])
+            simplices = {'v0': self._elements[:, 0], 'v1': self._elements[:, 1], 'v2': self._elements[:, 2]}
+            self._cache[key] = gv.TriMesh((simplices, nodes), kdims=['v0', 'v1', 'v2'], crs=crs,
+                                          datatype=['dictionary'])
+        return self._cache[key]
+
+    def element_index(self):
+        """ Returns the element index of the mesh, building it on first use """
+        if 'element_index' not in self._cache:
+            with span('mesh.element_index'):
+                self._cache['element_index'] = ElementIndex(self._coords[0], self._coords[1], self._elements)
+        return self._cache['element_index']
+
+    def node_index(self):
+        """ Returns the KD-tree of the mesh nodes, building it on first use """
+        if 'node_index' not in self._cache:
+            self._cache['node_index'] = NodeIndex(self._coords[0], self._coords[1])
+        return self._cache['node_index']
+
+    def locate(self, x, y):
+        """
+        Finds the elements containing each of the points (x, y). Returns the
+        element ids (-1 outside of the mesh) and the (N, 3) barycentric weights.
+        """
+        return self.element_index().locate(x, y)
+
+    def locate_stations(self, x, y):
+        """
+        Locates a set of stations (e.g. gauges) within the mesh. The element ids
+        and barycentric weights are cached on the mesh so that repeated probes
+        of the same stations do not search the mesh again.
+        """
+        x = np.ascontiguousarray(x, dtype=np.float64)
+        y = np.ascontiguousarray(y, dtype=np.float64)
+        key = ('stations', hashlib.blake2b(x.data, digest_size=16).hexdigest(),
+               hashlib.blake2b(y.data, digest_size=16).hexdigest())
+        if key not in self._cache:
+            self._cache[key] = self.locate(x, y)
+        return self._cache[key]
+
+    def nearest_node(self, x, y, k=1, return_distance=False):
+        """ Returns the ids of the k nearest nodes of each of the points (x, y) """
+        nodes, distance = self.node_index().nearest(x, y, k=k)
+        if return_distance:
+            return nodes, distance
+        return nodes
+
+    def _node_xy(self, crs=None):
+        if crs is None:
+            return self._coords[0], self._coords[1]
+        return self.projected_coords(crs)
+
+    @timed('mesh.interpolate_points')
+    def interpolate_points(self, x, y, values, method='linear', crs=None, **kwargs):
+        """
+        Interpolates scattered points (e.g. survey points or Model.points) at the nodes
+        with the nearest, idw or linear method, returning the node values. Points
+        given in another cartopy crs are interpolated at the projected nodes.
+        """
+        from . import interpolation
+        px, py = self._node_xy(crs)
+        return interpolation.interpolate(x, y, values, px, py, method=method, **kwargs)
+
+    @timed('mesh.interpolate_raster')
+    def interpolate_raster(self, raster, x=None, y=None, crs=None, **kwargs):
+        """
+        Samples a raster (e.g. a DEM) at the nodes with bilinear interpolation,
+        returning the node values. The raster is either a (y, x) xarray DataArray,
+        opened lazily so that only the windows covering the nodes are read, or any
+        2D array (e.g. np.memmap) along with the x and y coordinates of its pixels.
+        """
+        if x is None or y is None:
+            x, y = raster[raster.dims[1]].values, raster[raster.dims[0]].values
+        from . import interpolation
+        px, py = self._node_xy(crs)
+        return interpolation.bilinear(x, y, raster, px, py, **kwargs)
+
+    def _polygon_arrays(self, polygons):
+        """
+        Converts polygons, given as a holoviews Path/Polygons element or a list of (n, 2)
+        vertex arrays, to arrays of vertices in the projection of the mesh.
+        """
+        crs = getattr(polygons, 'crs', None)
+        if hasattr(polygons, 'split'):
+            polygons = polygons.split(datatype='array', dimensions=polygons.kdims[:2])
+        arrays = [np.asarray(polygon, dtype=np.float64)[:, :2] for polygon in polygons if len(polygon)]
+        target = self.projection.get_crs()
+        if crs is not None and crs.proj4_init != target.proj4_init:
+            transformer = get_transformer(crs, target)
+            arrays = [np.column_stack(transformer.transform(a[:, 0], a[:, 1])) for a in arrays]
+        return arrays
+
+    def select_nodes(self, polygons):
+        """ Returns a boolean array flagging the nodes within any of the polygons """
+        x, y = self._coords[0], self._coords[1]
+        selected = np.zeros(len(x), dtype=bool)
+        index = self.node_index()
+        for polygon in self._polygon_arrays(polygons):
+            # only test the nodes within the bounding box of the polygon
+            (x0, y0), (x1, y1) = polygon.min(axis=0), polygon.max(axis=0)
+            candidates = index.in_box(x0, y0, x1, y1)
+            candidates = candidates[~selected[candidates]]
+            selected[candidates] = points_in_polygon(x[candidates], y[candidates], polygon)
+        return selected
+
+    @timed('mesh.subset')
+    def subset(self, polygons, how='any'):
+        """
+        Cuts the mesh down to the elements within the polygons, given as a holoviews
+        Path/Polygons element (e.g. Model.polys or Model.path_output()) or a list of
+        (n, 2) vertex arrays. Elements are kept when any (or all, with how='all') of
+        their nodes are inside. Returns the new mesh along with the array mapping
+        its nodes to the node ids of this mesh, used to subset Simulation results.
+        """
+        if how not in ('any', 'all'):
+            raise RuntimeError('Subset must keep the elements with any or all of their nodes inside.')
+        inside = self.select_nodes(polygons)[self._elements]
+        elements = self._elements[inside.all(axis=1) if how == 'all' else inside.any(axis=1)]
+        node_map = np.unique(elements)
+        mesh = type(self)(level_of_detail=self.level_of_detail, raster_cache=self.raster_cache)
+        mesh._set_metadata(self._metadata())
+        mesh.set_arrays(self._coords[:, node_map], np.searchsorted(node_map, elements).astype(np.int32))
+        return mesh, node_map
+
+    def edges(self):
+        """
+        Returns the unique edges of the mesh as an (k, 2) int32 array of node
+        ids along with a boolean array flagging the boundary edges.
+        """
+        if 'edges' not in self._cache:
+            with span('mesh.edges'):
+                self._cache['edges'] = unique_edges(self._elements)
+        return self._cache['edges']
+
+    def node_elements(self):
+        """ Returns the node to element adjacency in CSR form (offsets, element ids), see topology.node_elements """
+        if 'node_elements' not in self._cache:
+            with span('mesh.node_elements'):
+                self._cache['node_elements'] = node_elements(self._elements, self._coords.shape[1])
+        return self._cache['node_elements']
+
+    def node_neighbours(self):
+        """ Returns the node to node adjacency in CSR form (offsets, node ids) """
+        if 'node_neighbours' not in self._cache:
+            edges = self.edges()[0]
+            with span('mesh.node_neighbours'):
+                self._cache['node_neighbours'] = node_neighbours(edges, self._coords.shape[1])
+        return self._cache['node_neighbours']
+
+    def element_neighbours(self):
+        """ Returns the (m, 3) neighbours of every element across each of its edges, -1 on the boundary """
+        if 'element_neighbours' not in self._cache:
+            with span('mesh.element_neighbours'):
+                self._cache['element_neighbours'] = element_neighbours(self._elements)
+        return self._cache['element_neighbours']
+
+    def boundary_loops(self):
+        """ Returns the closed boundary loops in CSR form (offsets, node ids ordered along each loop) """
+        if 'boundary_loops' not in self._cache:
+            neighbours = self.element_neighbours()
+            with span('mesh.boundary_loops'):
+                self._cache['boundary_loops'] = boundary_loops(self._elements, neighbours)
+        return self._cache['boundary_loops']
+
+    def element_quality(self):
+        """
+        Returns a DataFrame of the quality metrics of every element: the signed
+        area, the aspect ratio and the minimum angle in degrees.
+        """
+        if 'element_quality' not in self._cache:
+            with span('mesh.element_quality'):
+                area, aspect_ratio, min_angle = element_quality(self._coords[0], self._coords[1], self._elements)
+                self._cache['element_quality'] = pd.DataFrame(
+                    {'area': area, 'aspect_ratio': aspect_ratio, 'min_angle': min_angle}, copy=False)
+        return self._cache['element_quality']
+
+    def topology_problems(self):
+        """
+        Returns the number of degenerate, duplicate, non-manifold and inverted
+        elements and of unused nodes in the mesh.
+        """
+        quality = self.element_quality()
+        return topology_problems(self._elements, self._coords.shape[1], self.element_neighbours(),
+                                 quality['area'].values, quality['aspect_ratio'].values)
+
+    @timed('mesh.validate')
+    def validate(self):
+        """
+        Checks the columns and node references of the mesh along with its topology,
+        raising a RuntimeError for degenerate, duplicate, non-manifold or inverted
+        elements. Unused nodes are only logged as a warning.
+        """
+        super(Unstructured2D, self).validate()
+        problems = self.topology_problems()
+        if problems['unused_nodes']:
+            log.warning('{} nodes are not used by any element'.format(problems['unused_nodes']))
+        errors = ['{} {}'.format(num, name.replace('_', ' ')) for name, num in problems.items()
+                  if num and name != 'unused_nodes']
+        if errors:
+            raise RuntimeError('Invalid mesh topology: {}'.format(', '.join(errors)))
+
+    def get_wireframe(self):
+        """ Returns the unique edges of the mesh as a single NaN separated Path """
+        if 'wireframe' not in self._cache:
+            edges = self.edges()[0]
+            with span('mesh.wireframe'):
+                xs, ys = edge_lines(self._coords[0], self._coords[1], edges)
+                self._cache['wireframe'] = _path(xs, ys)
+        return self._cache['wireframe']
+
+    def pyramid(self):
+        """ Returns the level-of-detail pyramid of the mesh, building it on first use """
+        if 'pyramid' not in self._cache:
+            with span('mesh.pyramid'):
+                x, y, z = self._coords
+                self._cache['pyramid'] = MeshPyramid(x, y, z, self._elements)
+        return self._cache['pyramid']
+
+    def _level_tri_mesh(self, level):
+        """ Returns the TriMesh of a pyramid level, -1 being the full resolution mesh """
+        if level < 0:
+            return self.get_tri_mesh()
+        key = ('level_tri_mesh', level)
+        if key not in self._cache:
+            cell, x, y, z, elements = self.pyramid().levels[level]
+            self._cache[key] = _tri_mesh(x, y, z, elements)
+        return self._cache[key]
+
+    def _level_wireframe(self, level):
+        """ Returns the wireframe Path of a pyramid level, -1 being the full resolution mesh """
+        if level < 0:
+            return self.get_wireframe()
+        key = ('level_wireframe', level)
+        if key not in self._cache:
+            cell, x, y, z, elements = self.pyramid().levels[level]
+            xs, ys = edge_lines(x, y, unique_edges(elements)[0])
+            self._cache[key] = _path(xs, ys)
+        return self._cache[key]
+
+    def _lod_tri_mesh(self, x_range=None, y_range=None, width=None, height=None, **kwargs):
+        return self._level_tri_mesh(self.pyramid().select(x_range, y_range, width, height))
+
+    def _lod_wireframe(self, x_range=None, y_range=None, width=None, height=None, **kwargs):
+        return self._level_wireframe(self.pyramid().select(x_range, y_range, width, height))
+
+    @timed('mesh.rasterize_values')
+    def rasterize_values(self, values=None, variable='z', time=None, x_range=None, y_range=None,
+                         width=None, height=None):
+        """
+        Rasterizes node values over the mesh for the given view and returns the
+        resulting Image. Values default to the node elevations. When the
+        raster_cache is set, repeated requests for the same variable, time and
+        view are served from it without re-aggregating.
+        """
+        width, height = width or 400, height or 400
+        if values is not None:
+            values = np.ascontiguousarray(values)
+        # the values are part of the key, the same variable and time may come from different results
+        digest = None if values is None else hashlib.blake2b(values.data, digest_size=16).hexdigest()
+        key = (self.content_hash(), variable, time, digest, x_range, y_range, width, height,
+               values is None and self.level_of_detail)
+        if self.raster_cache is not None:
+            image = self.raster_cache.get(key)
+            if image is not None:
+                count('mesh.raster_cache.hits')
+                return image
+            count('mesh.raster_cache.misses')
+
+        import datashader as ds
+        from holoviews.operation.datashader import rasterize
+
+        if values is not None:
+            tri_mesh = _tri_mesh(self._coords[0], self._coords[1], values, self._elements, vdim=variable)
+        elif self.level_of_detail:
+            tri_mesh = self._lod_tri_mesh(x_range, y_range, width, height)
+        else:
+            tri_mesh = self.get_tri_mesh()
+        with span('mesh.rasterize'):
+            image = rasterize(tri_mesh, aggregator=ds.mean(variable), dynamic=False, x_range=x_range,
+                              y_range=y_range, width=width, height=height)
+
+        if self.raster_cache is not None:
+            self.raster_cache.put(key, image)
+        return image
+
+    def _cached_elevation(self, x_range=None, y_range=None, width=None, height=None, **kwargs):
+        return self.rasterize_values(x_range=x_range, y_range=y_range, width=width, height=height)
+
+    @timed('mesh.sample')
+    def sample(self, x, y, values='z'):
+        """
+        Interpolates node values at the points (x, y) with barycentric weights
+        within the containing elements. Values may be the name of a verts
+        column or an array of node values. Points outside the mesh are NaN.
+        """
+        if isinstance(values, str):
+            values = self.verts[values].values
+        return self.element_index().interpolate(values, x, y)
+
+    @timed('mesh.view_elements')
     def view_elements(self, agg='any', line_color='black', cmap='black'):
         """ Method to display the mesh as wireframe elements"""
+        import holoviews as hv
+        from holoviews.operation.datashader import datashade
+        from holoviews.streams import RangeXY, PlotSize
+
         if self.elements_toggle:
-            # return datashade(self.tri_mesh.edgepaths.opts(line_color=line_color), aggregator=agg,
+            # return datashade(self.get_wireframe().opts(line_color=line_color), aggregator=agg,
             #                  precompute=True, cmap=cmap)
-            return datashade(self.tri_mesh.edgepaths.opts(opts.TriMesh(edge_cmap='yellow', edge_color='yellow')))
+            if self.level_of_detail:
+                wireframe = hv.DynamicMap(self._lod_wireframe, streams=[RangeXY(), PlotSize()])
+                return datashade(wireframe, precompute=True)
+            return datashade(self.get_wireframe(), precompute=True)
         else:
             return hv.Curve([])
 
+    @timed('mesh.view_elevation')
     def view_elevation(self):
         """ Method to display the mesh as continuous color contours"""
+        import holoviews as hv
+        import datashader as ds
+        from holoviews.operation.datashader import rasterize
+        from holoviews.streams import RangeXY, PlotSize
+
         if self.elevation_toggle:
-            return rasterize(self.tri_mesh, aggregator=ds.mean('z'), precompute=True)
+            if self.raster_cache is not None:
+                return hv.DynamicMap(self._cached_elevation, streams=[RangeXY(), PlotSize()])
+            if self.level_of_detail:
+                tri_mesh = hv.DynamicMap(self._lod_tri_mesh, streams=[RangeXY(), PlotSize()])
+                return rasterize(tri_mesh, aggregator=ds.mean('z'), precompute=True)
+            return rasterize(self.get_tri_mesh(), aggregator=ds.mean('z'), precompute=True)
         else:
             return hv.Curve([])
 
+    @param.depends('quality_toggle', 'quality_metric')
+    def view_quality(self):
+        """ Method to display the quality metric of the elements as a rasterized map"""
+        import holoviews as hv
+        import datashader as ds
+        from holoviews.operation.datashader import rasterize
+
+        if not self.quality_toggle:
+            return hv.Curve([])
+        key = ('quality_tri_mesh', self.quality_metric)
+        if key not in self._cache:
+            values = self.element_quality()[self.quality_metric].values
+            # degenerate elements have an infinite aspect ratio, which would swamp the color range
+            values = np.where(np.isfinite(values), values, np.nan)
+            self._cache[key] = _element_tri_mesh(self._coords[0], self._coords[1], self._elements, values,
+                                                 self.quality_metric)
+        return rasterize(self._cache[key], aggregator=ds.mean(self.quality_metric), precompute=True)
+
     def view_mesh(self, agg='any', line_color='black', cmap='black'):
 
         elements = self.view_elements(agg=agg, line_color=line_color, cmap=cmap)
 
         elevation = self.view_elevation()
 
-        return elevation * elements
+        quality = self.view_quality()
+
+        return elevation * quality * elements
+
+
+# in-memory results are wrapped as dask arrays of at most this many chunks, so
+# that the graphs of the results stay the same size as time steps are appended
+_MAX_VIEW_CHUNKS = 64
+
+
+def _dask_view(data, chunk):
+    """
+    Wraps an in-memory array as a dask array chunked along its first axis in
+    chunks of at least chunk rows, each chunk being a view of the array. Unlike
+    dask.array.from_array the array is neither copied nor hashed, which matters
+    as results grow step by step.
+    """
+    import dask.array as da
+    name = 'genesis-view-' + uuid.uuid4().hex
+    chunk = max(chunk, -(-data.shape[0] // _MAX_VIEW_CHUNKS), 1)
+    starts = range(0, data.shape[0], chunk)
+    rest = (0,) * (data.ndim - 1)
+    graph = {(name, i) + rest: data[start:start + chunk] for i, start in enumerate(starts)}
+    chunks = (tuple(min(chunk, data.shape[0] - start) for start in starts),) + tuple((n,) for n in data.shape[1:])
+    return da.Array(graph, name, chunks, dtype=data.dtype)
+
+
+class _StepBuffer(object):
+    """
+    Results of a running Simulation held in numpy buffers along times, grown by
+    doubling as steps are appended. Appending copies only the new steps and the
+    results are rebuilt as views of the buffers, so neither the cost of an append
+    nor the dask graph of the results grows with the number of steps. Results
+    that are already lazy (e.g. opened from a file) are kept as they are and the
+    buffered steps are concatenated to them.
+    """
+    def __init__(self, base, time_chunk):
+        self.template = base
+        self.time_chunk = time_chunk
+        self.variables = [var for var in base.data_vars if 'times' in base[var].dims]
+        self.dims = {var: ('times',) + tuple(d for d in base[var].dims if d != 'times') for var in self.variables}
+        self.lazy_base = None
+        if any(base[var].chunks is not None for var in self.variables):
+            self.lazy_base = base
+        self.data = {}
+        self.times = None
+        self.count = 0
+        if self.lazy_base is None:
+            # in-memory results are copied into the buffers once
+            self.append(base)
+
+    @staticmethod
+    def _grow(buffer, values, start):
+        end = start + len(values)
+        if buffer is None or len(buffer) < end:
+            capacity = max(end, 2 * (len(buffer) if buffer is not None else 0))
+            dtype = values.dtype if buffer is None else np.result_type(buffer, values)
+            grown = np.empty((capacity,) + values.shape[1:], dtype=dtype)
+            if buffer is not None:
+                grown[:start] = buffer[:start]
+            buffer = grown
+        buffer[start:end] = values
+        return buffer
+
+    def append(self, step):
+        missing = [var for var in self.variables if var not in step.data_vars]
+        if missing:
+            raise RuntimeError('Appended results are missing {}'.format(', '.join(missing)))
+        for var in self.variables:
+            values = np.asarray(step[var].transpose(*self.dims[var]).values)
+            self.data[var] = self._grow(self.data.get(var), values, self.count)
+        self.times = self._grow(self.times, np.asarray(step.times.values), self.count)
+        self.count += step.sizes['times']
+
+    def dataset(self):
+        """ Returns the results, the buffered steps being views of the buffers """
+        template = self.template
+        coords = {name: coord for name, coord in template.coords.items() if 'times' not in coord.dims}
+        coords['times'] = self.times[:self.count]
+        data_vars = {var: (self.dims[var], self.data[var][:self.count], template[var].attrs)
+                     for var in self.variables}
+        data_vars.update({var: template[var] for var in template.data_vars if var not in self.variables})
+        buffered = xr.Dataset(data_vars, coords=coords, attrs=template.attrs)
+        if self.lazy_base is None:
+            return buffered
+        buffered = buffered[self.variables].copy(data={var: _dask_view(buffered[var].data, self.time_chunk)
+                                                       for var in self.variables})
+        return xr.concat([self.lazy_base, buffered], dim='times', data_vars='minimal', coords='minimal',
+                         compat='override')
 
 
 class Simulation(param.Parameterized):
@@ -106,13 +765,54 @@ class Simulation(param.Parameterized):
     time = param.ObjectSelector()
     result_label = param.ObjectSelector()
 
-    id = param.ClassSelector(default=uuid.uuid4(), class_=uuid.UUID, precedence=-1)
+    id = param.ClassSelector(default=None, class_=uuid.UUID, precedence=-1)
 
     sim_name = param.String(default='default_sim')
 
+    lazy = param.Boolean(default=False, precedence=-1, doc="""
+        Keep the results chunked along times with dask, computing derived
+        magnitudes and loading data only for the time slices that are viewed.""")
+
+    time_chunk = param.Integer(default=1, bounds=(1, None), precedence=-1, doc="""
+        Number of time steps per chunk when the results are lazy.""")
+
+    follow_time = param.Boolean(default=True, precedence=-1, doc="""
+        Select the latest time step whenever new results are appended.""")
+
+    derived_cache_size = param.Integer(default=16, bounds=(0, None), precedence=-1, doc="""
+        Number of evaluated time slices of derived variables kept in memory.""")
+
+    display_range = param.Parameter(default=None, precedence=-1, doc="""
+        DisplayRangeOpts whose color range and bounds are set from the statistics
+        of the selected result by update_display_range.""")
+
+    auto_range = param.Boolean(default=False, precedence=-1, doc="""
+        Update the display range whenever result_label or time changes. The first
+        update of every result reads it in full to compute its statistics.""")
+
+    range_percentiles = param.Range(default=(2, 98), bounds=(0, 100), precedence=-1, doc="""
+        Percentiles of the selected result used as the color range, the bounds
+        span its min and max.""")
+
+    range_per_time = param.Boolean(default=False, precedence=-1, doc="""
+        Set the display range from the statistics of the selected time rather
+        than those of all times.""")
+
     def __init__(self, **params):
         super(Simulation, self).__init__(**params)
+        # a default uuid4() on the parameter would be shared by every instance
+        if self.id is None:
+            self.id = uuid.uuid4()
         self.xarr = xr.DataArray(data=())
+        # registry of derived variables and the memoized time slices evaluated from them
+        self._derived = OrderedDict()
+        self._derived_cache = OrderedDict()
+        # buffered results of a running simulation, see append_result
+        self._steps = None
+        # dataset given to set_result, kept alive with the results (e.g. acquired from a SharedStore)
+        self._source = None
+        # streaming statistics of the results, the histogram of all times and those of every time
+        self._statistics = {}
 
     def read(self, *args,  **kwargs):
         raise ChildProcessError('read method not set')
@@ -123,15 +823,36 @@ class Simulation(param.Parameterized):
     def solve(self, *args,  **kwargs):
         raise ChildProcessError('solve method not set')
 
+    def register_derived(self, variable):
+        """
+        Registers a DerivedVariable. It is listed in result_label alongside the
+        native variables and evaluated per time slice on demand, never for all
+        time steps up front.
+        """
+        self._derived[variable.name] = variable
+        self._clear_derived_cache(variable.name)
+        self._statistics.pop(variable.name, None)
+        if self._add_derived_array(variable):
+            self._set_labels(reset=False)
+
+    @timed('simulation.set_result')
     def set_result(self, model):
         self.default = False
 
         self.sim_name = model.attrs['project_name']
+        self._source = model
+
+        if self.lazy:
+            # chunk along times so that every operation below stays lazy
+            model = model.chunk({'times': self.time_chunk})
 
         self.xarr = model
+        self._derived_cache.clear()
+        self._statistics = {}
+        self._steps = None
 
-        # precalculate the magnitudes of vector datasets
-        for var in self.xarr.data_vars:
+        # register the magnitudes of vector datasets as derived variables
+        for var in list(self.xarr.data_vars):
             # if this is a vector dataset
             if 'BEGVEC' in self.xarr[var].attrs.keys():
                 # modify the attributes of the vector DataArray
@@ -147,20 +868,75 @@ class Simulation(param.Parameterized):
                     else:
                         mag_attr[key] = self.xarr[var].attrs[key]
 
-                # calculate magnitude
-                mag = np.sqrt(self.xarr[var].data[:, :, 0] ** 2 +
-                              self.xarr[var].data[:, :, 1] ** 2)  # dim: [time, nodes]
+                name = self.xarr[var].name + ' Magnitude'
+                self._derived[name] = DerivedVariable(name, magnitude, [var], attrs=mag_attr)
+
+        for variable in list(self._derived.values()):
+            self._add_derived_array(variable)
 
-                # create magnitude DataArray
-                mag_arr = xr.DataArray(
-                    name=self.xarr[var].name + ' Magnitude',
-                    coords=self.xarr[var].coords,
-                    dims=('times', 'nodes_ids'),
-                    data=mag,
-                    attrs=mag_attr)
-                # add DataArray into DataSet
-                self.xarr[mag_arr.name] = mag_arr
+        self._set_labels()
 
+        # set the times into the parameter
+        self.param.time.objects = list(self.xarr.times.data)
+        # set the default time
+        self.time = self.xarr.times.data[0]
+
+    def load_result(self, model, runner, callback=None):
+        """
+        Sets the result in the background on a TaskRunner (ui_util.interface).
+        The dataset is loaded into memory (or chunked when lazy) on a worker
+        thread and set_result then runs on the next tick of the calling document,
+        followed by callback(self). Returns the Task.
+        """
+        def prepare(model):
+            return model.chunk({'times': self.time_chunk}) if self.lazy else model.load()
+
+        def finish(model):
+            self.set_result(model)
+            if callback is not None:
+                callback(self)
+        return runner.submit(prepare, model, callback=finish,
+                             message='Loading {} ... '.format(model.attrs.get('project_name', 'results')))
+
+    @timed('simulation.append_result')
+    def append_result(self, step):
+        """
+        Appends new time steps, given as a Dataset with a times dimension, to the
+        results of a running simulation. The steps are copied into buffers that
+        grow by doubling (see _StepBuffer), so appending costs the same at every
+        step. Derived variables are only evaluated for the new steps when they
+        are viewed and the time objects are extended with the new times.
+        """
+        if 'times' not in step.dims:
+            raise RuntimeError('Appended results must have a times dimension')
+        if not isinstance(self.xarr, xr.Dataset):
+            if 'project_name' not in step.attrs:
+                step = step.assign_attrs(project_name=self.sim_name)
+            self.set_result(step)
+            return
+
+        if self._steps is None:
+            native = [var for var in self.xarr.data_vars if var not in self._derived]
+            self._steps = _StepBuffer(self.xarr[native], self.time_chunk)
+        self._steps.append(step)
+        self.xarr = self._steps.dataset()
+        for variable in list(self._derived.values()):
+            self._add_derived_array(variable)
+
+        times = list(step.times.data)
+        for label in list(self._statistics):
+            self._update_statistics(label, start=self.xarr.sizes['times'] - len(times))
+        # extended in place, notifying the watchers of the objects once, rather than re-validating every time
+        self.param.time.objects.extend(times)
+        if self.follow_time:
+            self.time = times[-1]
+
+    def append_results(self, steps):
+        """ Appends every Dataset yielded by steps (e.g. a generator following a running solve) """
+        for step in steps:
+            self.append_result(step)
+
+    def _set_labels(self, reset=True):
         # get the labels of the result variables (that can be plotted with this class)
         labels = []
         for var in self.xarr.data_vars:
@@ -177,9 +953,173 @@ class Simulation(param.Parameterized):
         # set the list of labels into the parameter
         self.param.result_label.objects = labels
         # set the default label
-        self.result_label = labels[0]
+        if reset or self.result_label not in labels:
+            self.result_label = labels[0]
 
-        # set the times into the parameter
-        self.param.time.objects = list(self.xarr.times.data)
-        # set the default time
-        self.time = self.xarr.times.data[0]
+    def _add_derived_array(self, variable):
+        """ Adds a derived variable to the dataset as a lazy array, if its inputs are available """
+        if not isinstance(self.xarr, xr.Dataset):
+            return False
+        if not all(label in self.xarr.data_vars or label in self._derived for label in variable.inputs):
+            return False
+        coords = {k: v for k, v in self.xarr.coords.items() if set(v.dims) <= {'times', 'nodes_ids'}}
+        self.xarr[variable.name] = xr.DataArray(variable.lazy(self), coords=coords, dims=('times', 'nodes_ids'),
+                                                attrs=variable.attrs)
+        return True
+
+    def _clear_derived_cache(self, name):
+        for key in [k for k in self._derived_cache if k[0] == name]:
+            del self._derived_cache[key]
+
+    def lazy_data(self, label):
+        """ Returns the data of a result for all times as a dask array, without loading or computing it """
+        if label in self._derived:
+            return self._derived[label].lazy(self)
+        import dask.array as da
+        data = self.xarr[label].data
+        if not isinstance(data, da.Array):
+            data = _dask_view(np.asarray(data), self.time_chunk)
+        return data
+
+    @timed('simulation.subset')
+    def subset(self, node_map):
+        """
+        Returns a new Simulation with the results restricted to the nodes of a mesh
+        subset, node_map holding the ids of those nodes in the full mesh (see
+        Unstructured2D.subset). Contiguous node ranges are sliced as views of the
+        results without copying them. Derived variables are registered on the new
+        Simulation too, except differences with the results of other simulations.
+        """
+        node_map = np.asarray(node_map)
+        nodes = node_map
+        if len(node_map) and node_map[-1] - node_map[0] + 1 == len(node_map) and (np.diff(node_map) == 1).all():
+            nodes = slice(int(node_map[0]), int(node_map[-1]) + 1)
+        native = [var for var in self.xarr.data_vars if var not in self._derived]
+        sim = type(self)(sim_name=self.sim_name, lazy=self.lazy, time_chunk=self.time_chunk,
+                         follow_time=self.follow_time, derived_cache_size=self.derived_cache_size)
+        for variable in self._derived.values():
+            if not isinstance(variable, Difference):
+                sim._derived[variable.name] = variable
+        sim.set_result(self.xarr[native].isel(nodes_ids=nodes))
+        sim.result_label, sim.time = self.result_label, self.time
+        return sim
+
+    def get_result(self, label=None, time=None):
+        """
+        Returns the node values of a result at a single time as a numpy array,
+        defaulting to the selected result_label and time. Lazy results are only
+        loaded and computed for that time slice, derived variables are
+        evaluated for that slice and memoized.
+        """
+        label = self.result_label if label is None else label
+        time = self.time if time is None else time
+        if label not in self._derived:
+            return np.asarray(self.xarr[label].sel(times=time).values)
+
+        key = (label, time)
+        if key in self._derived_cache:
+            self._derived_cache.move_to_end(key)
+            count('simulation.derived_cache.hits')
+            return self._derived_cache[key]
+        count('simulation.derived_cache.misses')
+        with span('simulation.evaluate_derived'):
+            values = np.asarray(self._derived[label].evaluate(self, time))
+        self._derived_cache[key] = values
+        while len(self._derived_cache) > self.derived_cache_size:
+            self._derived_cache.popitem(last=False)
+        return values
+
+    def _read_block(self, label, times, nodes=slice(None)):
+        """ Reads the values of a result for a slice of times (and optionally a subset of nodes) """
+        if label in self._derived:
+            return np.asarray(self._derived[label].read_block(self, times, nodes))
+        return np.asarray(self.xarr[label].isel(times=times, nodes_ids=nodes).values)
+
+    def _update_statistics(self, label, start=0, chunk_size=16):
+        """ Accumulates the statistics of a result from time index start onwards, in a single chunked pass """
+        histogram, per_time = self._statistics.setdefault(label, (StreamingHistogram(), []))
+        for first in range(start, self.xarr.sizes['times'], chunk_size):
+            block = self._read_block(label, slice(first, first + chunk_size))
+            histogram.update(block)
+            per_time.extend(StreamingHistogram(bins=256).update(values) for values in block)
+
+    @timed('simulation.compute_statistics')
+    def compute_statistics(self, labels=None, chunk_size=16):
+        """
+        Computes the min, max, mean and approximate percentiles of results (all of
+        the result labels by default), over all times and for every time, reading
+        each result once in chunks of chunk_size times. The statistics are cached
+        until new results are set and updated incrementally as steps are appended.
+        """
+        labels = self.param.result_label.objects if labels is None else labels
+        for label in labels:
+            if label not in self._statistics:
+                self._update_statistics(label, chunk_size=chunk_size)
+
+    def statistics(self, label=None, time=None, percentiles=(2, 98)):
+        """
+        Returns the count, min, max, mean and percentiles of a result, over all times
+        or at a single time, computing the statistics of the result if needed.
+        """
+        label = self.result_label if label is None else label
+        self.compute_statistics([label])
+        histogram, per_time = self._statistics[label]
+        if time is not None:
+            histogram = per_time[self.xarr.get_index('times').get_loc(time)]
+        return histogram.summary(percentiles)
+
+    @param.depends('result_label', 'time', 'display_range', 'auto_range', watch=True)
+    def _follow_display_range(self):
+        if self.auto_range:
+            self.update_display_range()
+
+    def update_display_range(self):
+        """
+        Sets the color range and bounds of display_range from the statistics of
+        the selected result, computing them on first use (e.g. before displaying
+        the result).
+        """
+        if self.display_range is None or not isinstance(self.xarr, xr.Dataset):
+            return
+        if self.result_label not in self.xarr.data_vars:
+            return
+        time = None
+        if self.range_per_time and self.time in self.xarr.get_index('times'):
+            time = self.time
+        stats = self.statistics(self.result_label, time, self.range_percentiles)
+        low, high = [stats['p{:g}'.format(q)] for q in self.range_percentiles]
+        if np.isfinite([low, high]).all():
+            self.display_range.set_range((float(low), float(high)), (float(stats['min']), float(stats['max'])))
+
+    @timed('simulation.probe')
+    def probe(self, mesh, x, y, label=None, chunk_size=256):
+        """
+        Extracts the time series of a result at a set of stations (e.g. gauges)
+        located within the Unstructured2D mesh. The stations are located once,
+        only the nodes of their elements are read and the times are processed in
+        chunks of chunk_size steps. Returns a (stations, times) DataArray, stations
+        outside of the mesh are NaN.
+        """
+        label = self.result_label if label is None else label
+        elements, weights = mesh.locate_stations(x, y)
+        found = np.flatnonzero(elements >= 0)
+        # read each node needed by the stations only once
+        needed, inverse = np.unique(mesh.elements[elements[found]], return_inverse=True)
+        inverse = inverse.reshape(len(found), 3)
+
+        num_times = self.xarr.sizes['times']
+        values = None
+        for start in range(0, num_times, chunk_size):
+            times = slice(start, start + chunk_size)
+            block = self._read_block(label, times, needed)
+            if values is None:
+                values = np.full((len(elements), num_times) + block.shape[2:], np.nan)
+            # (times, stations, 3, ...) weighted onto (stations, times, ...)
+            values[found, times] = np.einsum('tsk...,sk->st...', block[:, inverse], weights[found])
+
+        if values is None:
+            values = np.full((len(elements), num_times), np.nan)
+        dims = ('stations', 'times') + tuple(self.xarr[label].dims[2:])
+        return xr.DataArray(values, dims=dims, name=label,
+                            coords={'times': self.xarr.times.values, 'x': ('stations', np.asarray(x)),
+                                    'y': ('stations', np.asarray(y))})
@@ -0,0 +1,194 @@
+"""
+Readers and writers for unstructured mesh files. Supports the ASCII 2DM/3DM
+node and element card format as well as a native binary format (a directory
+of .npy arrays plus json metadata) that can be memory-mapped.
+"""
+
+import io
+import os
+import json
+import uuid
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+
+log = logging.getLogger('genesis')
+
+ASCII_EXTENSIONS = ('.2dm', '.3dm')
+BINARY_EXTENSION = '.genesis'
+BINARY_VERSION = 1
+
+
+def _card_lines(lines, card):
+    """ Lines whose first whitespace-delimited token is the card """
+    n = len(card)
+    return [line for line in lines if line.startswith(card) and line[n:n + 1].isspace()]
+
+
+def _parse_cards(lines, card, columns):
+    """ Parses the fields following the card of every line starting with it into an (N, columns) array """
+    selected = _card_lines(lines, card)
+    if not selected:
+        return np.empty((0, columns))
+    try:
+        return pd.read_csv(io.BytesIO(b''.join(selected)), sep=r'\s+', header=None, engine='c',
+                           usecols=range(1, columns + 1), dtype=np.float64).values
+    except (ValueError, pd.errors.ParserError):
+        # ragged cards (e.g. trailing comments), split each line separately
+        return np.array([line.split()[1:columns + 1] for line in selected]).astype(np.float64)
+
+
+def _check_element_cards(lines):
+    """ Raises a RuntimeError for element cards other than E3T and E4Q (e.g. E6T or E8Q) """
+    for line in lines:
+        if line[:1] == b'E' and line[1:2].isdigit():
+            card = line.split(None, 1)[0]
+            if card not in (b'E3T', b'E4Q'):
+                raise RuntimeError('Unsupported element card {}'.format(card.decode('ascii', 'replace')))
+
+
+def read_ascii(path, chunk_size=2 ** 24):
+    """
+    Reads a 2DM/3DM mesh file in chunks of roughly chunk_size bytes. Returns
+    a (3, n) float64 array of node coordinates and an (m, 3) int32 array of
+    zero-based element connectivity. Quadrilaterals (E4Q) are split into two
+    triangles along their first diagonal, other element types raise a
+    RuntimeError.
+    """
+    nodes, elements = [], []
+    with open(path, 'rb') as f:
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                break
+            _check_element_cards(lines)
+            nodes.append(_parse_cards(lines, b'ND', 4))
+            elements.append(_parse_cards(lines, b'E3T', 4))
+            quads = _parse_cards(lines, b'E4Q', 5)
+            elements.append(quads[:, [0, 1, 2, 3]])
+            elements.append(quads[:, [0, 1, 3, 4]])
+    nodes = np.concatenate(nodes) if nodes else np.empty((0, 4))
+    elements = np.concatenate(elements) if elements else np.empty((0, 4))
+    # keep the order of the element ids, the two triangles of a quadrilateral being adjacent
+    elements = elements[np.argsort(elements[:, 0], kind='mergesort')]
+
+    node_ids = nodes[:, 0].astype(np.int64)
+    connectivity = elements[:, 1:4].astype(np.int64)
+    if np.array_equal(node_ids, np.arange(1, len(node_ids) + 1)):
+        connectivity -= 1
+    else:
+        # node ids are not sequential, map them onto their positions
+        order = np.argsort(node_ids)
+        connectivity = order[np.searchsorted(node_ids, connectivity, sorter=order)]
+
+    coords = np.ascontiguousarray(nodes[:, 1:4].T)
+    return coords, connectivity.astype(np.int32)
+
+
+def _write_rows(f, fmt, rows, chunk_size):
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        f.write((fmt * len(chunk)) % tuple(chunk.ravel().tolist()))
+
+
+def write_ascii(path, coords, elements, name=None, chunk_size=2 ** 16):
+    """ Writes the node coordinates and element connectivity to a 2DM/3DM mesh file """
+    coords = np.asarray(coords)
+    elements = np.asarray(elements)
+    with open(path, 'w') as f:
+        f.write('MESH2D\n')
+        if name:
+            f.write('MESHNAME "{}"\n'.format(name))
+        ids = np.arange(1, len(elements) + 1)
+        rows = np.column_stack([ids, elements + 1, np.ones(len(elements), dtype=np.int64)])
+        _write_rows(f, 'E3T %d %d %d %d %d\n', rows, chunk_size)
+        ids = np.arange(1, coords.shape[1] + 1)
+        rows = np.column_stack([ids, coords.T])
+        _write_rows(f, 'ND %d %.17g %.17g %.17g\n', rows, chunk_size)
+
+
+def read_binary(path, mmap=True):
+    """
+    Reads a binary mesh directory. When mmap is set the arrays are memory-mapped
+    read-only so that only the pages that are touched are loaded. Returns the
+    coordinates, the connectivity and the metadata dictionary.
+    """
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta.get('version') != BINARY_VERSION:
+        raise RuntimeError('Unsupported binary mesh version {}'.format(meta.get('version')))
+    mode = 'r' if mmap else None
+    coords = np.load(os.path.join(path, 'coords.npy'), mmap_mode=mode)
+    elements = np.load(os.path.join(path, 'elements.npy'), mmap_mode=mode)
+    return coords, elements, meta
+
+
+def write_binary(path, coords, elements, meta=None):
+    """
+    Writes the coordinates, connectivity and metadata to a binary mesh directory.
+    The files are written to a temporary directory next to path which is then
+    renamed into place, so that memory-mapped arrays of an existing mesh at
+    path (including the arrays being written) stay valid. Windows does not
+    allow renaming a directory whose files are memory-mapped, there the write
+    fails with a PermissionError and leaves the existing mesh untouched.
+    """
+    path = os.path.abspath(path)
+    temp = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+    try:
+        os.makedirs(temp)
+        np.save(os.path.join(temp, 'coords.npy'), np.ascontiguousarray(coords, dtype=np.float64))
+        np.save(os.path.join(temp, 'elements.npy'), np.ascontiguousarray(elements, dtype=np.int32))
+        meta = dict(meta or {})
+        meta['version'] = BINARY_VERSION
+        with open(os.path.join(temp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        _replace_directory(temp, path)
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+def _replace_directory(source, target):
+    """ Renames the source directory to target, moving an existing target aside and deleting it """
+    old = None
+    if os.path.exists(target):
+        old = '{}.{}.old'.format(target, uuid.uuid4().hex)
+        os.rename(target, old)
+    os.rename(source, target)
+    if old is not None:
+        # the files of the old directory stay readable through existing memory maps once unlinked
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def is_binary(path):
+    return path.endswith(BINARY_EXTENSION) or os.path.isfile(os.path.join(path, 'meta.json'))
+
+
+def cache_path(path):
+    """ The binary sidecar used to cache an ASCII mesh file """
+    return path + BINARY_EXTENSION
+
+
+def source_stamp(path):
+    """ Identifies the version of a source file by its size and modification time """
+    stat = os.stat(path)
+    return {'source_size': stat.st_size, 'source_mtime': stat.st_mtime}
+
+
+def read_cached(path):
+    """
+    Returns the binary sidecar of an ASCII mesh file if it is up to date with
+    the source file, otherwise None.
+    """
+    sidecar = cache_path(path)
+    if not os.path.isdir(sidecar):
+        return None
+    try:
+        coords, elements, meta = read_binary(sidecar)
+    except (IOError, OSError, ValueError, RuntimeError) as e:
+        log.warning('Ignoring unreadable mesh cache {}: {}'.format(sidecar, e))
+        return None
+    stamp = source_stamp(path)
+    if any(meta.get(key) != value for key, value in stamp.items()):
+        return None
+    return coords, elements, meta
@@ -5,6 +5,9 @@ import numpy as np
 import panel as pn
 import holoviews as hv
 from .util import GVTS
+from .sampling import path_stations, sample_grid
+from .spatial import ElementIndex
+from .instrument import timed, span, count
 import cartopy.crs as ccrs
 
 from holoviews.operation.datashader import rasterize
@@ -38,28 +41,19 @@ class Model(PolyAndPointAnnotator):
                 of the cross-section paths.""")
     aggregator = param.ClassSelector(class_=ds.reductions.Reduction,
                                      default=ds.mean(), precedence=-1)
+    sample_method = param.ObjectSelector(default='nearest', objects=['nearest', 'linear', 'barycentric'],
+                                         precedence=-1, doc="""
+                Method used to sample the data at the cross-section stations. The
+                barycentric method interpolates TriMesh nodes directly without
+                rasterizing, other elements fall back to linear sampling.""")
 
     def __init__(self, *args, **params):
         super(Model, self).__init__(*args, **params)
         self.conceptual_model = None
+        self._mesh_index = (None, None)
 
     # line cross section
-    def _gen_samples(self, geom):
-        """
-        Interpolates a LineString geometry to the defined
-        resolution. Returning the x- and y-coordinates along
-        with the distance along the path.
-        """
-        xs, ys, distance = [], [], []
-        dist = geom.length
-        for d in np.linspace(0, dist, int(dist / self.resolution)):
-            point = geom.interpolate(d)
-            xs.append(point.x)
-            ys.append(point.y)
-            distance.append(d)
-        return xs, ys, distance
-
-    # line cross section
+    @timed('model.sample')
     def _sample(self, obj, data):
         """
         Rasterizes the supplied object in the current region
@@ -84,20 +78,57 @@ class Model(PolyAndPointAnnotator):
         else:
             return hv.NdOverlay({0: hv.Curve([], 'Distance', vdim)})
 
+        if self.sample_method == 'barycentric' and isinstance(obj, TriMesh):
+            return self._sample_mesh(obj, path, vdim)
+
         (x0, x1), (y0, y1) = x_range, y_range
         width, height = (max([min([(x1 - x0) / self.resolution, 500]), 10]),
                          max([min([(y1 - y0) / self.resolution, 500]), 10]))
-        raster = rasterize(obj, x_range=x_range, y_range=y_range,
-                           aggregator=self.aggregator, width=int(width),
-                           height=int(height), dynamic=False)
+        with span('model.sample.rasterize'):
+            raster = rasterize(obj, x_range=x_range, y_range=y_range,
+                               aggregator=self.aggregator, width=int(width),
+                               height=int(height), dynamic=False)
         x, y = raster.kdims
+        # sample all of the paths in a single vectorized pass
+        xs, ys, distance, offsets = path_stations(
+            path.split(datatype='array', dimensions=path.kdims[:2]), self.resolution)
+        count('model.sample.stations', len(xs))
+        grid = raster.data[raster.vdims[0].name]
+        method = 'linear' if self.sample_method == 'barycentric' else self.sample_method
+        values = sample_grid(grid[x.name].values, grid[y.name].values,
+                             grid.transpose(y.name, x.name).values, xs, ys, method=method)
+        return self._sections(xs, ys, distance, offsets, values, vdim, x, y)
+
+    # line cross section
+    @timed('model.sample_mesh')
+    def _sample_mesh(self, obj, path, vdim):
+        """
+        Samples the nodes of the supplied TriMesh directly with the drawn
+        paths by locating each station within its containing element and
+        interpolating with barycentric weights. The element index is built
+        once per TriMesh and reused on subsequent calls.
+        """
+        x, y = obj.nodes.kdims[:2]
+        mesh, index = self._mesh_index
+        if mesh is not obj:
+            with span('model.sample_mesh.index'):
+                index = ElementIndex(obj.nodes.dimension_values(x), obj.nodes.dimension_values(y),
+                                     obj.array(obj.kdims[:3]).astype(int))
+            self._mesh_index = (obj, index)
+        xs, ys, distance, offsets = path_stations(
+            path.split(datatype='array', dimensions=path.kdims[:2]), self.resolution)
+        count('model.sample.stations', len(xs))
+        values = index.interpolate(obj.nodes.dimension_values(vdim), xs, ys)
+        return self._sections(xs, ys, distance, offsets, values, vdim, x, y)
+
+    # line cross section
+    @staticmethod
+    def _sections(xs, ys, distance, offsets, values, vdim, x, y):
+        """ Splits the flat array of sampled stations into an NdOverlay of Curves, one per path """
         sections = []
-        for g in path.geom():
-            xs, ys, distance = self._gen_samples(g)
-            indexes = {x.name: xs, y.name: ys}
-            points = raster.data.sel_points(method='nearest', **indexes).to_dataframe()
-            points['Distance'] = distance
-            sections.append(hv.Curve(points, 'Distance', vdims=[vdim, x, y]))
+        for start, end in zip(offsets[:-1], offsets[1:]):
+            sections.append(hv.Curve((distance[start:end], values[start:end], xs[start:end], ys[start:end]),
+                                     'Distance', vdims=[vdim, x, y]))
         return hv.NdOverlay(dict(enumerate(sections)))
 
     # line cross section
@@ -0,0 +1,100 @@
+"""
+Projection of the model data. Only depends on param and numpy at import time,
+cartopy and pyproj are imported when a crs or transformer is first needed.
+"""
+
+import param
+import numpy as np
+from functools import lru_cache
+
+from .instrument import timed, count
+
+
+@lru_cache(maxsize=None)
+def _make_crs(crs_label, UTM_zone_hemi, UTM_zone_num):
+    """ Builds the cartopy crs of a projection, memoized so that equal projections share one object """
+    import cartopy.crs as ccrs
+    if crs_label == 'UTM':
+        return ccrs.UTM(UTM_zone_num, southern_hemisphere=UTM_zone_hemi == 'South')
+
+    elif crs_label == 'Geographic':
+        return ccrs.PlateCarree()
+
+    elif crs_label == 'Mercator':
+        return ccrs.GOOGLE_MERCATOR
+
+    raise RuntimeError('Projection not found.')
+
+
+# pyproj transformers keyed by the proj4 definitions of their source and target crs
+_transformers = {}
+
+
+def get_transformer(source, target):
+    """ Returns the (memoized) pyproj transformer between two cartopy crs """
+    key = (source.proj4_init, target.proj4_init)
+    if key not in _transformers:
+        import pyproj
+        count('projection.transformers')
+        _transformers[key] = pyproj.Transformer.from_crs(source, target, always_xy=True)
+    return _transformers[key]
+
+
+class Projection(param.Parameterized):
+    crs_label = param.ObjectSelector(default='UTM', objects=['Geographic', 'Mercator', 'UTM'], precedence=1)
+    UTM_zone_hemi = param.ObjectSelector(default='North', objects=['North', 'South'], precedence=2)
+    UTM_zone_num = param.Integer(12, bounds=(1, 60), precedence=3)
+
+    @param.depends('crs_label', watch=True)
+    def _watch_utm_projection(self):
+        is_utm = self.crs_label == 'UTM'
+        self.param.UTM_zone_hemi.constant = not is_utm
+        self.param.UTM_zone_num.constant = not is_utm
+
+    def get_crs(self):
+        return _make_crs(self.crs_label, self.UTM_zone_hemi, self.UTM_zone_num)
+
+    @timed('projection.transform')
+    def transform(self, x, y, target):
+        """
+        Transforms arrays of x and y coordinates from this projection to the target,
+        a Projection or a cartopy crs, in a single vectorized call.
+        """
+        if isinstance(target, Projection):
+            target = target.get_crs()
+        source = self.get_crs()
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if source.proj4_init == target.proj4_init:
+            return x, y
+        return get_transformer(source, target).transform(x, y)
+
+    def set_crs(self, crs):
+        import cartopy.crs as ccrs
+        # ensure all params are enabled
+        self.set_constant(value=False)
+
+        if not isinstance(crs, ccrs.CRS):
+            raise RuntimeError('Projection must be an instance of cartopy.crs')
+
+        if isinstance(crs, ccrs.UTM):
+            self.crs_label = 'UTM'
+            self.UTM_zone_num = crs.proj4_params['zone']
+            if 'south' in crs.proj4_init:
+                self.UTM_zone_hemi = 'South'
+            else:
+                self.UTM_zone_hemi = 'North'
+
+        elif isinstance(crs, ccrs.PlateCarree):
+            self.crs_label = 'Geographic'
+
+        elif crs is ccrs.GOOGLE_MERCATOR:
+            self.crs_label = 'Mercator'
+
+        else:
+            raise RuntimeWarning('Projection {} not recognized.'.format(crs))
+
+    def set_constant(self, value=True):
+        """method to set all the parameters as enabled (value=False) or disabled (value=True)"""
+        for p in self.param:
+            self.param[p].constant = value
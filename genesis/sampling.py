@@ -0,0 +1,76 @@
+"""
+Vectorized helpers used to sample gridded and unstructured data along
+cross-section paths.
+"""
+
+import numpy as np
+
+
+def line_stations(coords, resolution):
+    """
+    Interpolates a line, given as an (N, 2) array of vertices, to the
+    requested resolution. Returns the x- and y-coordinates of the stations
+    along with the distance of each station along the line.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if len(coords) < 2:
+        return np.empty(0), np.empty(0), np.empty(0)
+    # cumulative distance of each vertex along the line
+    seg = np.hypot(np.diff(coords[:, 0]), np.diff(coords[:, 1]))
+    cum = np.concatenate([[0.0], np.cumsum(seg)])
+    dist = cum[-1]
+    distance = np.linspace(0, dist, int(dist / resolution))
+    xs = np.interp(distance, cum, coords[:, 0])
+    ys = np.interp(distance, cum, coords[:, 1])
+    return xs, ys, distance
+
+
+def path_stations(paths, resolution):
+    """
+    Converts a list of (N, 2) vertex arrays into one flat array of stations.
+    Returns the x- and y-coordinates, the distance along the owning path and
+    the offsets delimiting each path within the flat arrays.
+    """
+    stations = [line_stations(p, resolution) for p in paths]
+    counts = [len(s[0]) for s in stations]
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(int)
+    if not stations:
+        return np.empty(0), np.empty(0), np.empty(0), offsets
+    xs, ys, distance = (np.concatenate(a) for a in zip(*stations))
+    return xs, ys, distance, offsets
+
+
+def _grid_position(coords, values):
+    """ Fractional index of values within monotonic 1D cell centre coordinates """
+    coords = np.asarray(coords, dtype=np.float64)
+    if len(coords) < 2:
+        return np.zeros(len(values))
+    if coords[0] > coords[-1]:
+        return len(coords) - 1 - _grid_position(coords[::-1], values)
+    return np.interp(values, coords, np.arange(len(coords), dtype=np.float64))
+
+
+def sample_grid(xc, yc, values, xs, ys, method='nearest'):
+    """
+    Samples a 2D array of values indexed as [y, x] with cell centre
+    coordinates xc and yc at all of the stations (xs, ys) in a single
+    vectorized gather. The method may be 'nearest' or 'linear' (bilinear).
+    Stations outside the grid are clamped to the nearest edge cell.
+    """
+    values = np.asarray(values)
+    fx = _grid_position(xc, xs)
+    fy = _grid_position(yc, ys)
+    if method == 'nearest':
+        return values[np.rint(fy).astype(int), np.rint(fx).astype(int)]
+    elif method == 'linear':
+        nx, ny = values.shape[1], values.shape[0]
+        x0 = np.clip(np.floor(fx).astype(int), 0, max(nx - 2, 0))
+        y0 = np.clip(np.floor(fy).astype(int), 0, max(ny - 2, 0))
+        x1 = np.minimum(x0 + 1, nx - 1)
+        y1 = np.minimum(y0 + 1, ny - 1)
+        wx = np.clip(fx - x0, 0, 1)
+        wy = np.clip(fy - y0, 0, 1)
+        return ((values[y0, x0] * (1 - wx) + values[y0, x1] * wx) * (1 - wy) +
+                (values[y1, x0] * (1 - wx) + values[y1, x1] * wx) * wy)
+    else:
+        raise RuntimeError('Sampling method {} not recognized.'.format(method))
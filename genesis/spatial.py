@@ -0,0 +1,173 @@
+"""
+Spatial indexing of unstructured triangular meshes.
+"""
+
+import numpy as np
+
+
+def barycentric(x, y, tris, elements, px, py):
+    """
+    Computes the barycentric weights of the points (px, py) with respect
+    to the given triangles. Returns an (N, 3) array of weights, rows for
+    degenerate triangles are NaN.
+    """
+    nodes = tris[elements]
+    xa, xb, xc = x[nodes[:, 0]], x[nodes[:, 1]], x[nodes[:, 2]]
+    ya, yb, yc = y[nodes[:, 0]], y[nodes[:, 1]], y[nodes[:, 2]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        det = (yb - yc) * (xa - xc) + (xc - xb) * (ya - yc)
+        w0 = ((yb - yc) * (px - xc) + (xc - xb) * (py - yc)) / det
+        w1 = ((yc - ya) * (px - xc) + (xa - xc) * (py - yc)) / det
+    return np.column_stack([w0, w1, 1 - w0 - w1])
+
+
+def points_in_polygon(px, py, polygon):
+    """
+    Even-odd test of the points (px, py) against a polygon given as an (n, 2)
+    array of vertices. Loops over the edges of the polygon, vectorized over
+    the points. Returns a boolean array flagging the points inside.
+    """
+    px = np.asarray(px, dtype=np.float64)
+    py = np.asarray(py, dtype=np.float64)
+    vx, vy = polygon[:, 0], polygon[:, 1]
+    inside = np.zeros(len(px), dtype=bool)
+    for xi, yi, xj, yj in zip(vx, vy, np.roll(vx, 1), np.roll(vy, 1)):
+        # points whose horizontal ray crosses the edge
+        crosses = np.flatnonzero((yi > py) != (yj > py))
+        if not len(crosses):
+            continue
+        xcross = (xj - xi) * (py[crosses] - yi) / (yj - yi) + xi
+        inside[crosses] ^= px[crosses] < xcross
+    return inside
+
+
+class ElementIndex(object):
+    """
+    Uniform grid binning of the element bounding boxes of a triangular mesh,
+    stored in compressed (CSR) form. Used to locate the element containing
+    a batch of points without testing every element.
+    """
+    def __init__(self, x, y, tris, chunk_size=2 ** 16):
+        self.x = np.ascontiguousarray(x, dtype=np.float64)
+        self.y = np.ascontiguousarray(y, dtype=np.float64)
+        self.tris = np.ascontiguousarray(tris)
+        self.chunk_size = chunk_size
+
+        nodes = self.tris
+        ex, ey = self.x[nodes], self.y[nodes]
+        xmin, xmax = ex.min(axis=1), ex.max(axis=1)
+        ymin, ymax = ey.min(axis=1), ey.max(axis=1)
+
+        num = max(len(nodes), 1)
+        if len(nodes):
+            self.x0, self.y0 = xmin.min(), ymin.min()
+            width, height = max(xmax.max() - self.x0, 1e-12), max(ymax.max() - self.y0, 1e-12)
+        else:
+            self.x0, self.y0, width, height = 0.0, 0.0, 1.0, 1.0
+        # size the cells so that each holds about one element on average
+        cell = max(np.sqrt(width * height / num), (xmax - xmin).mean() if len(nodes) else 0,
+                   (ymax - ymin).mean() if len(nodes) else 0)
+        self.nx = int(np.clip(np.ceil(width / cell), 1, 2 ** 15))
+        self.ny = int(np.clip(np.ceil(height / cell), 1, 2 ** 15))
+        self.dx, self.dy = width / self.nx, height / self.ny
+
+        ix0, ix1 = self._cell(xmin, self.x0, self.dx, self.nx), self._cell(xmax, self.x0, self.dx, self.nx)
+        iy0, iy1 = self._cell(ymin, self.y0, self.dy, self.ny), self._cell(ymax, self.y0, self.dy, self.ny)
+        # expand each element into every cell its bounding box overlaps
+        spanx, spany = ix1 - ix0 + 1, iy1 - iy0 + 1
+        counts = spanx * spany
+        element = np.repeat(np.arange(len(nodes)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        sx = np.repeat(spanx, counts)
+        cells = (np.repeat(iy0, counts) + local // sx) * self.nx + np.repeat(ix0, counts) + local % sx
+
+        order = np.argsort(cells, kind='stable')
+        self.cell_elements = element[order].astype(np.int32)
+        self.cell_offsets = np.searchsorted(cells[order], np.arange(self.nx * self.ny + 1))
+
+    @staticmethod
+    def _cell(values, origin, size, num):
+        return np.clip(((values - origin) / size).astype(np.int64), 0, num - 1)
+
+    def locate(self, px, py, tolerance=1e-9):
+        """
+        Finds the element containing each of the points (px, py). Returns the
+        element ids (-1 for points outside of the mesh) and the (N, 3)
+        barycentric weights of each point within its element.
+        """
+        px = np.atleast_1d(np.asarray(px, dtype=np.float64))
+        py = np.atleast_1d(np.asarray(py, dtype=np.float64))
+        elements = np.full(len(px), -1, dtype=np.int64)
+        weights = np.full((len(px), 3), np.nan)
+        for start in range(0, len(px), self.chunk_size):
+            end = start + self.chunk_size
+            elements[start:end], weights[start:end] = self._locate(px[start:end], py[start:end], tolerance)
+        return elements, weights
+
+    def _locate(self, px, py, tolerance):
+        elements = np.full(len(px), -1, dtype=np.int64)
+        weights = np.full((len(px), 3), np.nan)
+
+        inside = ((px >= self.x0) & (px <= self.x0 + self.dx * self.nx) &
+                  (py >= self.y0) & (py <= self.y0 + self.dy * self.ny))
+        points = np.flatnonzero(inside)
+        cells = (self._cell(py[points], self.y0, self.dy, self.ny) * self.nx +
+                 self._cell(px[points], self.x0, self.dx, self.nx))
+        # gather every candidate element of every point
+        starts, counts = self.cell_offsets[cells], self.cell_offsets[cells + 1] - self.cell_offsets[cells]
+        point = np.repeat(points, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidates = self.cell_elements[np.repeat(starts, counts) + local]
+
+        w = barycentric(self.x, self.y, self.tris, candidates, px[point], py[point])
+        valid = np.all(w >= -tolerance, axis=1)
+        # keep the first containing element of each point
+        found, first = np.unique(point[valid], return_index=True)
+        elements[found] = candidates[valid][first]
+        weights[found] = w[valid][first]
+        return elements, weights
+
+    def interpolate(self, values, px, py):
+        """
+        Interpolates the node values at the points (px, py) with barycentric
+        weights. Points outside of the mesh are returned as NaN.
+        """
+        elements, weights = self.locate(px, py)
+        return self.interpolate_located(values, elements, weights)
+
+    def interpolate_located(self, values, elements, weights):
+        """ Interpolates node values using previously located elements and weights """
+        values = np.asarray(values, dtype=np.float64)
+        found = elements >= 0
+        result = np.full(len(elements), np.nan)
+        result[found] = np.einsum('ij,ij->i', values[self.tris[elements[found]]], weights[found])
+        return result
+
+
+class NodeIndex(object):
+    """ KD-tree of the mesh nodes used to answer nearest node queries """
+    def __init__(self, x, y):
+        import scipy
+        from scipy.spatial import cKDTree
+        self.tree = cKDTree(np.column_stack([x, y]), balanced_tree=False)
+        # n_jobs was renamed workers in scipy 1.6, the last releases supporting Python 3.6 only have n_jobs
+        version = tuple(int(v) for v in scipy.__version__.split('.')[:2])
+        self._parallel = {'workers': -1} if version >= (1, 6) else {'n_jobs': -1}
+
+    def nearest(self, px, py, k=1):
+        """
+        Finds the k nearest nodes of each of the points (px, py), querying on
+        all cores. Returns the node ids and the distances to them.
+        """
+        points = np.column_stack([np.atleast_1d(px), np.atleast_1d(py)])
+        distance, nodes = self.tree.query(points, k=k, **self._parallel)
+        return nodes, distance
+
+    def in_box(self, x0, y0, x1, y1):
+        """ Returns the sorted ids of the nodes within the box (x0, y0) - (x1, y1) """
+        half = max(x1 - x0, y1 - y0) / 2.0
+        nodes = np.asarray(self.tree.query_ball_point([(x0 + x1) / 2.0, (y0 + y1) / 2.0], half, p=np.inf),
+                           dtype=np.int64)
+        data = self.tree.data[nodes]
+        inside = (data[:, 0] >= x0) & (data[:, 0] <= x1) & (data[:, 1] >= y0) & (data[:, 1] <= y1)
+        return np.sort(nodes[inside])
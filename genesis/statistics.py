@@ -0,0 +1,93 @@
+"""
+Streaming statistics of simulation results, computed in a single chunked pass.
+"""
+
+import numpy as np
+
+
+class StreamingHistogram(object):
+    """
+    Histogram whose range grows with the data. Whenever new values fall outside
+    of the range, the bin width is doubled and pairs of bins are merged, so the
+    counts never have to be recomputed from the data. Gives the exact count,
+    min, max and mean along with percentiles approximated within a bin width.
+    """
+    def __init__(self, bins=1024):
+        self.bins = bins + bins % 2
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.lower = None
+        self.width = None
+        self.count = 0
+        self.total = 0.0
+        self.min = np.nan
+        self.max = np.nan
+
+    def _expand(self, vmin, vmax):
+        if self.lower is None:
+            self.lower = vmin
+            self.width = max((vmax - vmin) / self.bins, abs(vmin) * 1e-12, 1e-300)
+        while vmin < self.lower or vmax >= self.lower + self.bins * self.width:
+            merged = self.counts.reshape(-1, 2).sum(axis=1)
+            self.counts = np.zeros(self.bins, dtype=np.int64)
+            if vmin < self.lower:
+                # grow downwards, the current bins become the upper half
+                self.lower -= self.bins * self.width
+                self.counts[self.bins // 2:] = merged
+            else:
+                self.counts[:self.bins // 2] = merged
+            self.width *= 2
+
+    def update(self, values):
+        """ Adds the finite values of an array to the histogram """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return self
+        vmin, vmax = values.min(), values.max()
+        self._expand(vmin, vmax)
+        index = np.minimum(((values - self.lower) / self.width).astype(np.int64), self.bins - 1)
+        self.counts += np.bincount(index, minlength=self.bins)
+        self.count += len(values)
+        self.total += values.sum()
+        self.min = np.fmin(self.min, vmin)
+        self.max = np.fmax(self.max, vmax)
+        return self
+
+    def merge(self, other):
+        """ Adds the counts of another histogram, placing its bins by their centers """
+        if not other.count:
+            return self
+        self._expand(other.min, other.max)
+        centers = np.clip(other.lower + (np.arange(other.bins) + 0.5) * other.width, other.min, other.max)
+        index = np.minimum(((centers - self.lower) / self.width).astype(np.int64), self.bins - 1)
+        self.counts += np.bincount(index, weights=other.counts, minlength=self.bins).astype(np.int64)
+        self.count += other.count
+        self.total += other.total
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def percentile(self, q):
+        """ Approximate percentiles (0 - 100), interpolated linearly within the bins """
+        q = np.asarray(q, dtype=np.float64)
+        if not self.count:
+            return np.full(q.shape, np.nan)
+        cumulative = np.cumsum(self.counts)
+        target = q / 100.0 * self.count
+        # bin holding each percentile, interpolated by the count reached within it
+        index = np.minimum(np.searchsorted(cumulative, target), self.bins - 1)
+        counts = self.counts[index]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(counts > 0, (target - cumulative[index] + counts) / counts, 0.0)
+        return np.clip(self.lower + (index + fraction) * self.width, self.min, self.max)
+
+    def summary(self, percentiles=(2, 98)):
+        """ Returns the count, min, max, mean and percentiles as a dictionary """
+        result = {'count': self.count, 'min': self.min, 'max': self.max, 'mean': self.mean}
+        for q, value in zip(percentiles, self.percentile(percentiles)):
+            result['p{:g}'.format(q)] = value
+        return result
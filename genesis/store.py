@@ -0,0 +1,191 @@
+"""
+Process-wide store of read-only mesh arrays and result datasets shared between
+Panel sessions. Meshes are memory-mapped from binary files, so every session
+and every server process reading the same file shares the pages of the
+operating system cache instead of holding its own copy.
+"""
+
+import os
+import json
+import logging
+import tempfile
+import threading
+import weakref
+
+import xarray as xr
+
+from .mesh import Unstructured2D
+from . import mesh_io
+
+log = logging.getLogger('genesis')
+
+
+class _Entry(object):
+    def __init__(self, value, meta=None):
+        self.value = value
+        self.meta = meta or {}
+        # derived mesh data (indexes, views, ...) shared by the meshes of the entry
+        self.cache = {}
+        self.refs = 0
+
+
+class SharedStore(object):
+    """
+    Reference-counted store of meshes and results keyed by file (path, size and
+    modification time) or by content hash. Every acquire returns a new object,
+    owned by the caller, backed by the shared read-only data. The reference is
+    released explicitly with release or when the object is garbage collected,
+    the shared data is dropped once no object refers to it.
+    """
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'genesis-store')
+        self._entries = {}
+        self._finalizers = {}
+        self._lock = threading.Lock()
+        # releases of collected objects not yet applied, see _release
+        self._pending = []
+
+    def __len__(self):
+        with self._lock:
+            self._apply_releases()
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._apply_releases()
+            return key in self._entries
+
+    @staticmethod
+    def _file_key(kind, path):
+        path = os.path.abspath(path)
+        stamp_path = os.path.join(path, 'meta.json') if os.path.isdir(path) else path
+        stamp = mesh_io.source_stamp(stamp_path)
+        return kind, path, stamp['source_size'], stamp['source_mtime']
+
+    def _acquire(self, key, load):
+        with self._lock:
+            self._apply_releases()
+            entry = self._entries.get(key)
+            if entry is None:
+                log.debug('Loading {} into the shared store'.format(key))
+                entry = self._entries[key] = load()
+            entry.refs += 1
+            # releases queued by the garbage collector while loading
+            self._apply_releases()
+            return entry
+
+    def _track(self, obj, key):
+        finalizer = weakref.finalize(obj, self._release, key, id(obj))
+        self._finalizers[id(obj)] = finalizer
+        return obj
+
+    def _release(self, key, obj_id):
+        # finalizers may run from the garbage collector while this thread holds the lock
+        # (e.g. within _acquire), the release is then applied by the next store operation
+        self._pending.append((key, obj_id))
+        if self._lock.acquire(False):
+            try:
+                self._apply_releases()
+            finally:
+                self._lock.release()
+
+    def _apply_releases(self):
+        while self._pending:
+            key, obj_id = self._pending.pop()
+            self._finalizers.pop(obj_id, None)
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del self._entries[key]
+                if isinstance(entry.value, xr.Dataset):
+                    entry.value.close()
+
+    def release(self, obj):
+        """ Releases the reference held by an object acquired from the store """
+        finalizer = self._finalizers.get(id(obj))
+        if finalizer is not None:
+            finalizer()
+
+    def refs(self, key):
+        with self._lock:
+            self._apply_releases()
+            entry = self._entries.get(key)
+            return entry.refs if entry is not None else 0
+
+    @staticmethod
+    def _load_mesh(path):
+        if mesh_io.is_binary(path):
+            coords, elements, meta = mesh_io.read_binary(path, mmap=True)
+            return _Entry((coords, elements), meta)
+        cached = mesh_io.read_cached(path)
+        if cached is None:
+            coords, elements = mesh_io.read_ascii(path)
+            # a stale sidecar may still be mapped by meshes of an older entry, write_binary
+            # renames the new files into place rather than overwriting the mapped ones
+            try:
+                mesh_io.write_binary(mesh_io.cache_path(path), coords, elements, mesh_io.source_stamp(path))
+                cached = mesh_io.read_cached(path)
+            except (IOError, OSError) as e:
+                log.warning('Unable to write mesh cache for {}: {}'.format(path, e))
+        if cached is None:
+            # the arrays are held in memory, shared within this process only
+            coords.flags.writeable = False
+            elements.flags.writeable = False
+            return _Entry((coords, elements))
+        coords, elements, meta = cached
+        return _Entry((coords, elements), meta)
+
+    def _mesh(self, entry, key, mesh_class, params):
+        mesh = (mesh_class or Unstructured2D)(**params)
+        mesh._set_metadata(entry.meta)
+        mesh.set_arrays(*entry.value)
+        mesh._cache = entry.cache
+        return self._track(mesh, key)
+
+    def acquire_mesh(self, path, mesh_class=None, **params):
+        """
+        Returns a mesh (Unstructured2D by default) read from an ASCII or binary mesh
+        file, sharing the memory-mapped arrays and derived data of every mesh
+        acquired from the same file. The arrays are read-only, modifying the
+        elevation of a mesh (set_elevation) gives it a private copy.
+        """
+        key = self._file_key('mesh', path)
+        entry = self._acquire(key, lambda: self._load_mesh(path))
+        return self._mesh(entry, key, mesh_class, params)
+
+    def share_mesh(self, mesh, **params):
+        """
+        Returns a copy of a mesh backed by the store, keyed by its content hash.
+        The arrays are written once to a binary file in the store directory and
+        memory-mapped, so other processes sharing the mesh reuse the same file.
+        """
+        key = ('mesh', mesh.content_hash())
+        path = os.path.join(self.directory, mesh.content_hash() + mesh_io.BINARY_EXTENSION)
+
+        def load():
+            if not os.path.isfile(os.path.join(path, 'meta.json')):
+                mesh_io.write_binary(path, mesh.coords, mesh.elements, mesh._metadata())
+            coords, elements, meta = mesh_io.read_binary(path, mmap=True)
+            return _Entry((coords, elements), meta)
+
+        entry = self._acquire(key, load)
+        return self._mesh(entry, key, type(mesh), params)
+
+    def acquire_result(self, path, **kwargs):
+        """
+        Returns the results Dataset of a file, opened lazily once and shared by all
+        of the sessions. Each caller receives a shallow copy, so that variables
+        added to it (e.g. derived variables of a Simulation) stay private. The
+        reference is held as long as the returned Dataset is alive, a Simulation
+        keeps the Dataset given to set_result alive along with its results.
+        """
+        # the options may hold unhashable values (e.g. chunks={'times': 1})
+        key = self._file_key('result', path) + (json.dumps(kwargs, sort_keys=True, default=repr),)
+        entry = self._acquire(key, lambda: _Entry(xr.open_dataset(path, **kwargs)))
+        return self._track(entry.value.copy(deep=False), key)
+
+
+# store shared by the whole process
+store = SharedStore()
@@ -0,0 +1,199 @@
+"""
+Vectorized topology of unstructured triangular meshes.
+"""
+
+import numpy as np
+
+
+def unique_edges(elements):
+    """
+    Builds the table of unique edges of a triangular mesh. Returns an (k, 2)
+    int32 array of edges with the lower node id first and a boolean array
+    flagging the edges on the boundary (edges used by a single element).
+    """
+    elements = np.asarray(elements)
+    edges = np.concatenate([elements[:, [0, 1]], elements[:, [1, 2]], elements[:, [2, 0]]])
+    edges.sort(axis=1)
+    # encode each node pair as a single integer key so it can be deduplicated in one sort
+    num = np.int64(edges.max()) + 1 if len(edges) else 1
+    keys = edges[:, 0].astype(np.int64) * num + edges[:, 1]
+    keys, counts = np.unique(keys, return_counts=True)
+    edges = np.column_stack([keys // num, keys % num]).astype(np.int32)
+    return edges, counts == 1
+
+
+def edge_lines(x, y, edges):
+    """
+    Converts an edge table into single x and y arrays where every edge is
+    separated from the next by NaN, ready to be aggregated as one path.
+    """
+    num = len(edges)
+    xs = np.full(num * 3, np.nan)
+    ys = np.full(num * 3, np.nan)
+    xs[0::3], xs[1::3] = x[edges[:, 0]], x[edges[:, 1]]
+    ys[0::3], ys[1::3] = y[edges[:, 0]], y[edges[:, 1]]
+    return xs, ys
+
+
+def node_elements(elements, num_nodes):
+    """
+    Builds the node to element adjacency of a triangular mesh in compressed (CSR)
+    form. Returns the int64 offsets, of length num_nodes + 1, and the int32 ids of
+    the elements of each node, those of node i being elements[offsets[i]:offsets[i + 1]].
+    """
+    nodes = np.asarray(elements).ravel()
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(nodes, minlength=num_nodes), out=offsets[1:])
+    order = np.argsort(nodes, kind='stable')
+    return offsets, (order // 3).astype(np.int32)
+
+
+def node_neighbours(edges, num_nodes):
+    """
+    Builds the node to node adjacency of the unique edges in compressed (CSR)
+    form, as node_elements. The neighbours of each node are sorted when the
+    edges are those of unique_edges.
+    """
+    edges = np.asarray(edges)
+    # the lower neighbours of each node come first, then the higher ones
+    source = np.concatenate([edges[:, 1], edges[:, 0]])
+    target = np.concatenate([edges[:, 0], edges[:, 1]])
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=num_nodes), out=offsets[1:])
+    order = np.argsort(source, kind='stable')
+    return offsets, target[order].astype(np.int32)
+
+
+def element_neighbours(elements):
+    """
+    Finds the neighbour of every element across each of its edges, edge k joining
+    nodes k and k + 1. Returns an (m, 3) int32 array of element ids, -1 on the
+    boundary and -2 for non-manifold edges shared by more than two elements.
+    """
+    elements = np.asarray(elements)
+    num_elements = len(elements)
+    neighbours = np.full(num_elements * 3, -1, dtype=np.int32)
+    if not num_elements:
+        return neighbours.reshape(0, 3)
+    # half-edges keyed by their node pair, matched up in a single sort
+    a, b = elements.ravel(), elements[:, [1, 2, 0]].ravel()
+    num = np.int64(elements.max()) + 1
+    keys = np.minimum(a, b).astype(np.int64) * num + np.maximum(a, b)
+    order = np.argsort(keys)
+    keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    counts = np.diff(np.r_[starts, len(keys)])
+    pairs = starts[counts == 2]
+    first, second = order[pairs], order[pairs + 1]
+    neighbours[first], neighbours[second] = second // 3, first // 3
+    shared = starts[counts > 2]
+    neighbours[order[np.repeat(shared, counts[counts > 2]) + _ranges(counts[counts > 2])]] = -2
+    return neighbours.reshape(num_elements, 3)
+
+
+def _ranges(counts):
+    """ Concatenation of arange(count) for each of the counts """
+    return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+def boundary_loops(elements, neighbours):
+    """
+    Chains the boundary edges (neighbours of -1, see element_neighbours) into
+    closed loops, following the orientation of the elements: with
+    counter-clockwise elements the outer boundary runs counter-clockwise and the
+    islands clockwise. Returns the loops in compressed form, int64 offsets and
+    the int32 node ids of each loop, ordered along it. The loops are ranked with
+    pointer jumping, in a logarithmic number of vectorized passes.
+    """
+    elements = np.asarray(elements)
+    element, side = np.nonzero(neighbours == -1)
+    start = elements[element, side]
+    end = elements[element, (side + 1) % 3]
+    num = len(start)
+    if not num:
+        return np.zeros(1, dtype=np.int64), np.empty(0, dtype=np.int32)
+    # pair the k-th edge ending at a node with the k-th edge starting there
+    outgoing, incoming = np.argsort(start, kind='stable'), np.argsort(end, kind='stable')
+    if not np.array_equal(start[outgoing], end[incoming]):
+        raise RuntimeError('Boundary is not closed, elements have inconsistent orientations.')
+    successor = np.empty(num, dtype=np.int64)
+    successor[incoming] = outgoing
+
+    # label each loop by its lowest edge
+    label, pointer = np.arange(num), successor.copy()
+    for _ in range(int(np.ceil(np.log2(num))) + 1):
+        label = np.minimum(label, label[pointer])
+        pointer = pointer[pointer]
+    # open the loops after their lowest edge and rank the edges by their distance to it
+    pointer = np.where(label[successor] == successor, -1, successor)
+    rank = (pointer >= 0).astype(np.int64)
+    while (pointer >= 0).any():
+        valid = np.flatnonzero(pointer >= 0)
+        rank[valid] += rank[pointer[valid]]
+        pointer[valid] = pointer[pointer[valid]]
+    order = np.lexsort((-rank, label))
+    offsets = np.searchsorted(label[order], np.flatnonzero(label == np.arange(num)))
+    return np.r_[offsets, num].astype(np.int64), start[order].astype(np.int32)
+
+
+def element_quality(x, y, elements, chunk_size=2 ** 20, tolerance=4 * np.finfo(float).eps):
+    """
+    Computes the quality metrics of every element: the signed area (negative for
+    clockwise elements), the aspect ratio (longest edge times the perimeter over
+    4 sqrt(3) times the area, 1 for an equilateral triangle and infinite when
+    degenerate) and the minimum angle in degrees, 0 when degenerate. Elements
+    are degenerate when twice their area is at most tolerance times the square
+    of their longest edge, which covers collinear nodes up to rounding errors.
+    Processed in chunks of elements to bound the temporary memory.
+    """
+    elements = np.asarray(elements)
+    num_elements = len(elements)
+    area = np.empty(num_elements)
+    aspect_ratio = np.empty(num_elements)
+    min_angle = np.empty(num_elements)
+    for first in range(0, num_elements, chunk_size):
+        s = slice(first, first + chunk_size)
+        nodes = [np.ascontiguousarray(elements[s, k]) for k in range(3)]
+        xn, yn = [x[n] for n in nodes], [y[n] for n in nodes]
+        # edge vectors, edge k joining nodes k and k + 1
+        ex = [xn[(k + 1) % 3] - xn[k] for k in range(3)]
+        ey = [yn[(k + 1) % 3] - yn[k] for k in range(3)]
+        signed = ex[2] * ey[0] - ey[2] * ex[0]
+        area[s] = 0.5 * signed
+        cross = np.abs(signed)
+        l0, l1, l2 = [np.hypot(ex[k], ey[k]) for k in range(3)]
+        shortest = np.minimum(np.minimum(l0, l1), l2)
+        longest = np.maximum(np.maximum(l0, l1), l2)
+        product = l0 * l1 * l2
+        valid = cross > tolerance * longest ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            aspect_ratio[s] = np.where(valid, longest * (l0 + l1 + l2) / (2 * np.sqrt(3) * cross), np.inf)
+            # the smallest angle is opposite the shortest edge, sin(angle) = 2 area / (product of the other edges)
+            sine = np.where(valid, cross * shortest / product, 0.0)
+        min_angle[s] = np.degrees(np.arcsin(np.minimum(sine, 1.0)))
+    return area, aspect_ratio, min_angle
+
+
+def topology_problems(elements, num_nodes, neighbours, area, aspect_ratio):
+    """
+    Counts the problems of a mesh given its element neighbours, signed areas and
+    aspect ratios (see element_quality): degenerate elements (repeated nodes or
+    an infinite aspect ratio), duplicate elements, elements on non-manifold
+    edges, inverted elements (oriented against the majority, ignoring the
+    degenerate ones) and nodes not used by any element.
+    """
+    elements = np.asarray(elements)
+    repeated = ((elements[:, 0] == elements[:, 1]) | (elements[:, 1] == elements[:, 2]) |
+                (elements[:, 2] == elements[:, 0]))
+    degenerate = repeated | ~(aspect_ratio < np.inf)
+    # two copies of an element are each other's neighbour across all three edges
+    duplicate = (neighbours[:, 0] >= 0) & (neighbours[:, 0] == neighbours[:, 1]) & \
+        (neighbours[:, 1] == neighbours[:, 2])
+    clockwise = np.count_nonzero((area < 0) & ~degenerate)
+    counter_clockwise = np.count_nonzero((area > 0) & ~degenerate)
+    used = np.bincount(elements.ravel(), minlength=num_nodes) > 0 if len(elements) else np.zeros(num_nodes, bool)
+    return {'degenerate_elements': int(np.count_nonzero(degenerate)),
+            'duplicate_elements': int(np.count_nonzero(duplicate)),
+            'non_manifold_elements': int(np.count_nonzero((neighbours == -2).any(axis=1))),
+            'inverted_elements': int(min(clockwise, counter_clockwise)),
+            'unused_nodes': int(num_nodes - np.count_nonzero(used))}
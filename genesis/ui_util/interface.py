@@ -1,28 +1,253 @@
+import inspect
+import logging
+import threading
+import tracemalloc
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
 import param
+import pandas as pd
 import panel as pn
 
+from ..instrument import instrumentation
+
 """
 This module is a storehouse of utility codes that are only used at the highest
 level of the interface. These are convenience functions for rapid prototyping
-of UIs. 
+of UIs.
 """
 
+log = logging.getLogger('genesis')
+
 
 class StatusBar(param.Parameterized):
     """ Status bar as a simple textbox and associated convenience functions """
     status = param.String(default='', label='', precedence=1)
 
+    progress = param.Integer(default=0, bounds=(0, 100), label='Progress', precedence=2)
+
+    cancel = param.Action(default=lambda self: self.request_cancel(), label='Cancel', precedence=3)
+
+    def __init__(self, **params):
+        super(StatusBar, self).__init__(**params)
+        # tasks cancelled by the cancel button
+        self._tasks = []
+
     def set_msg(self, message):
         self.status = message
 
+    def set_progress(self, fraction, message=None):
+        """ Sets the progress as a fraction (0 - 1) of the work done, along with an optional message """
+        self.progress = int(round(100 * min(max(fraction, 0), 1)))
+        if message is not None:
+            self.status = message
+
     def busy(self):
         self.status = 'Busy ... '
 
     def clear(self):
         self.status = ''
+        self.progress = 0
+
+    def track(self, task):
+        """ Registers a task (see TaskRunner) to be cancelled by the cancel button """
+        self._tasks = [t for t in self._tasks if not t.done()] + [task]
+
+    def request_cancel(self):
+        """ Requests the cancellation of the tasks reporting to this status bar """
+        for task in self._tasks:
+            task.cancel()
+        self.status = 'Cancelling ... '
 
     @param.depends('status', watch=True)
     def panel(self):
         return pn.panel(
-            self.param, parameters=['status'], widgets={'status': pn.widgets.TextInput(sizing_mode='stretch_width')},
+            self.param, parameters=['status', 'progress', 'cancel'],
+            widgets={'status': pn.widgets.TextInput(sizing_mode='stretch_width'),
+                     'progress': pn.widgets.Progress},
             show_name=False)
+
+
+class InstrumentationReport(param.Parameterized):
+    """
+    Panel widget to switch the instrumentation of genesis on and off and display
+    its report of timing spans and counters, meant to sit next to the StatusBar.
+    The instrumentation is shared by the whole process: switching it in one
+    session switches it for every session served by the process, and the
+    report and reset cover the work of all of them. Each widget starts from
+    the current state of the instrumentation.
+    """
+    enabled = param.Boolean(default=False, label='Instrumentation', precedence=1, doc="""
+        Enables the instrumentation of the whole process, not only of this session.""")
+
+    memory = param.Boolean(default=False, label='Trace memory', precedence=2)
+
+    refresh = param.Action(default=lambda self: self.update(), label='Refresh', precedence=3)
+
+    reset = param.Action(default=lambda self: self.clear(), label='Reset', precedence=4)
+
+    report = param.DataFrame(default=None, allow_None=True, precedence=-1)
+
+    def __init__(self, **params):
+        params.setdefault('enabled', instrumentation.enabled)
+        params.setdefault('memory', tracemalloc.is_tracing())
+        super(InstrumentationReport, self).__init__(**params)
+        self._toggle()
+        self.update()
+
+    @param.depends('enabled', 'memory', watch=True)
+    def _toggle(self):
+        instrumentation.disable()
+        if self.enabled:
+            instrumentation.enable(memory=self.memory)
+
+    def update(self):
+        self.report = instrumentation.report_frame()
+
+    def clear(self):
+        instrumentation.reset()
+        self.update()
+
+    @param.depends('report')
+    def view_report(self):
+        return pn.pane.DataFrame(self.report if self.report is not None else pd.DataFrame(),
+                                 index=False, sizing_mode='stretch_width')
+
+    def panel(self):
+        return pn.Column(
+            pn.panel(self.param, parameters=['enabled', 'memory', 'refresh', 'reset'], show_name=False),
+            self.view_report)
+
+
+class Task(object):
+    """
+    Handle of a function running on a TaskRunner. Functions accepting a task
+    argument receive their handle, to report progress and check for cancellation.
+    """
+    def __init__(self, runner, message, doc=None):
+        self.runner = runner
+        self.message = message
+        self.doc = doc
+        self.future = None
+        self._cancel_event = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """ Cancels the task, immediately if it has not started, otherwise at its next check of cancelled """
+        self._cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def report(self, fraction, message=None):
+        """ Reports the progress of the task as a fraction (0 - 1) of the work done """
+        if self.runner.status_bar is not None:
+            self.runner.schedule(partial(self.runner.status_bar.set_progress, fraction, message), self.doc)
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def wait(self, timeout=None):
+        """ Waits until the task has finished, including its callback. Returns False on timeout """
+        return self._finished.wait(timeout)
+
+
+class TaskRunner(param.Parameterized):
+    """
+    Runs heavy operations (e.g. Simulation.load_result or Ensemble.run_async) on
+    a pool of worker threads so that the Panel server stays responsive. Progress
+    and cancellation go through the status bar, and the callback receiving the
+    result runs on the next tick of the Bokeh document that submitted the task,
+    holding its lock. The functions themselves must not modify any parameter
+    displayed by the document, which is left to the callback.
+    """
+    status_bar = param.ClassSelector(default=None, class_=StatusBar, allow_None=True)
+
+    max_workers = param.Integer(default=2, bounds=(1, None))
+
+    def __init__(self, **params):
+        super(TaskRunner, self).__init__(**params)
+        self._executor = None
+        self._lock = threading.Lock()
+        # without a server, callbacks run on the worker threads one at a time
+        self._callback_lock = threading.RLock()
+        self.tasks = []
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    @staticmethod
+    def _document():
+        return pn.state.curdoc
+
+    def schedule(self, callback, doc=None):
+        """ Runs the callback on the next tick of the document, or immediately without a server """
+        doc = doc or self._document()
+        if doc is not None and doc.session_context is not None:
+            # worker threads have no current document, so pn.state.execute cannot find it
+            doc.add_next_tick_callback(callback)
+        else:
+            with self._callback_lock:
+                pn.state.execute(callback)
+
+    def submit(self, func, *args, callback=None, cancel_callback=None, message='Busy ... ', **kwargs):
+        """
+        Runs func(*args, **kwargs) in the background, passing the Task handle as the
+        task argument when func accepts one. callback(result) is called once it
+        completes, unless the task was cancelled or failed. When the task was
+        cancelled while running but func still returned (e.g. partial results),
+        cancel_callback(result) is called instead. Returns the Task.
+        """
+        doc = self._document()
+        task = Task(self, message, doc)
+        if 'task' in inspect.signature(func).parameters:
+            kwargs['task'] = task
+        task.future = self.executor.submit(func, *args, **kwargs)
+        if self.status_bar is not None:
+            self.status_bar.track(task)
+            self.status_bar.set_progress(0, message)
+        task.future.add_done_callback(lambda future: self.schedule(partial(self._finish, task, callback, cancel_callback), doc))
+        self.tasks = [t for t in self.tasks if not t.done()] + [task]
+        return task
+
+    def _finish(self, task, callback, cancel_callback=None):
+        try:
+            if task.cancelled:
+                future = task.future
+                if cancel_callback is not None and not future.cancelled() and future.exception() is None:
+                    cancel_callback(future.result())
+                raise CancelledError()
+            result = task.future.result()
+            if callback is not None:
+                callback(result)
+        except CancelledError:
+            self._set_msg('Cancelled: {}'.format(task.message))
+        except Exception as e:
+            log.error('Task "{}" failed: {}'.format(task.message, e))
+            self._set_msg('Failed: {} ({})'.format(task.message, e))
+        else:
+            if self.status_bar is not None and not any(not t.done() for t in self.tasks if t is not task):
+                self.status_bar.clear()
+        finally:
+            task._finished.set()
+
+    def _set_msg(self, message):
+        if self.status_bar is not None:
+            self.status_bar.set_msg(message)
+
+    def cancel_all(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -22,3 +22,10 @@ class ColormapOpts(param.Parameterized):
 
 class DisplayRangeOpts(param.Parameterized):
     color_range = param.Range(default=(0.0, 10), bounds=(-10, 20))
+
+    def set_range(self, color_range, bounds=None):
+        """ Sets the color range, widening the bounds first so that they always contain it """
+        low, high = color_range
+        bounds = color_range if bounds is None else bounds
+        self.param.color_range.bounds = (min(bounds[0], low), max(bounds[1], high))
+        self.color_range = (low, high)
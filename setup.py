@@ -10,10 +10,13 @@ setup(
         'holoviews',
         'geoviews',
         'cartopy',
+        'pyproj',
         'earthsim',
         'numpy',
+        'scipy',
         'pandas',
         'xarray',
+        'dask',
         'datashader',
         'colorcet',
         'jupyter'
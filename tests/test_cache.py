@@ -0,0 +1,43 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from genesis.cache import RasterCache
+from genesis.mesh import Unstructured2D
+
+
+class TestCacheMain(unittest.TestCase):
+
+    def test_raster_cache_lru(self):
+        cache = RasterCache(max_items=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+
+        # 'b' was the least recently used entry
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'disk_hits': 0, 'items': 2})
+
+    def test_raster_cache_spill(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = RasterCache(max_items=1, directory=directory)
+            cache.put(('mesh', 'z', None), [1, 2, 3])
+            cache.put(('mesh', 'z', 1.0), [4, 5, 6])
+
+            self.assertEqual(cache.get(('mesh', 'z', None)), [1, 2, 3])
+            self.assertEqual(cache.stats()['disk_hits'], 1)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_raster_cache_values(self):
+        mesh_object = Unstructured2D(raster_cache=RasterCache())
+        mesh_object.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [0, 0, 0, 0]], [[0, 1, 2], [1, 3, 2]])
+        first = mesh_object.rasterize_values(np.ones(4), 'depth', 0.0, width=4, height=4)
+        second = mesh_object.rasterize_values(np.full(4, 2.0), 'depth', 0.0, width=4, height=4)
+
+        # the same variable and time with other values is not served from the cache
+        self.assertEqual(np.nanmax(first.dimension_values(2)), 1.0)
+        self.assertEqual(np.nanmax(second.dimension_values(2)), 2.0)
+        self.assertIs(mesh_object.rasterize_values(np.ones(4), 'depth', 0.0, width=4, height=4), first)
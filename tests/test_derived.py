@@ -0,0 +1,51 @@
+import unittest
+import numpy as np
+import xarray as xr
+from genesis.mesh import Simulation
+from genesis.derived import DerivedVariable, Difference, direction, threshold
+
+
+def depth_result():
+    rng = np.random.RandomState(0)
+    return xr.Dataset(
+        {'Velocity': (('times', 'nodes_ids', 'vec'), rng.rand(3, 5, 2), {'BEGVEC': '', 'DIM': 2}),
+         'Depth': (('times', 'nodes_ids'), rng.rand(3, 5), {'BEGSCL': ''})},
+        coords={'times': np.arange(3, dtype=float), 'nodes_ids': np.arange(5)},
+        attrs={'project_name': 'test_project'})
+
+
+class TestDerivedMain(unittest.TestCase):
+
+    def test_register_derived(self):
+        result = depth_result()
+        sim_object = Simulation()
+        sim_object.set_result(result)
+        sim_object.register_derived(DerivedVariable('Wet', threshold(0.5), ['Depth']))
+        sim_object.register_derived(DerivedVariable('Velocity Direction', direction, ['Velocity']))
+
+        self.assertIn('Wet', sim_object.param.result_label.objects)
+        np.testing.assert_array_equal(sim_object.get_result('Wet', 1.0), result['Depth'].values[1] > 0.5)
+        vector = result['Velocity'].values[2]
+        np.testing.assert_allclose(sim_object.get_result('Velocity Direction', 2.0),
+                                   np.degrees(np.arctan2(vector[:, 1], vector[:, 0])))
+        # the full array is only available lazily
+        self.assertIsNotNone(sim_object.xarr['Wet'].chunks)
+
+    def test_derived_cache(self):
+        sim_object = Simulation(derived_cache_size=2)
+        sim_object.set_result(depth_result())
+        for time in [0.0, 1.0, 2.0]:
+            sim_object.get_result('Velocity Magnitude', time)
+
+        self.assertEqual(list(sim_object._derived_cache), [('Velocity Magnitude', 1.0), ('Velocity Magnitude', 2.0)])
+
+    def test_difference(self):
+        result = depth_result()
+        halved = result.copy(deep=True)
+        halved['Depth'] *= 0.5
+        base, other = Simulation(), Simulation()
+        base.set_result(result)
+        other.set_result(halved)
+        base.register_derived(Difference('Depth Difference', 'Depth', other))
+
+        np.testing.assert_allclose(base.get_result('Depth Difference', 0.0), result['Depth'].values[0] * 0.5)
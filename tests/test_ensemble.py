@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+import xarray as xr
+from genesis.mesh import Unstructured2D, Simulation
+from genesis.ensemble import Ensemble
+from genesis.ui_util.interface import StatusBar, TaskRunner
+
+
+class ScaledSimulation(Simulation):
+    """ Simulation whose depth is the mesh elevation scaled by a factor """
+    def __init__(self, factor=1.0, **params):
+        super(ScaledSimulation, self).__init__(**params)
+        self.factor = factor
+
+    def solve(self, mesh):
+        if self.factor < 0:
+            raise ValueError('negative factor')
+        depth = self.factor * mesh.coords[2][np.newaxis]
+        # a result without a project name cannot be set on the simulation
+        attrs = {'project_name': self.sim_name, 'units': mesh.units, 'zone': mesh.projection.UTM_zone_num}
+        return xr.Dataset({'Depth': (('times', 'nodes_ids'), depth, {'BEGSCL': ''})},
+                          coords={'times': [0.0], 'nodes_ids': np.arange(depth.shape[1])},
+                          attrs=attrs if self.factor else {})
+
+
+class TestEnsembleMain(unittest.TestCase):
+
+    def test_simulation_unique_id(self):
+        self.assertNotEqual(Simulation().id, Simulation().id)
+
+    def test_ensemble_run(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [1, 2, 3, 4]], [[0, 1, 2], [1, 3, 2]])
+        mesh_object.units = 'feet'
+        mesh_object.projection.UTM_zone_num = 15
+        sims = [ScaledSimulation(factor=f) for f in [1.0, 2.0, -1.0, 3.0, 0.0]]
+        status = StatusBar()
+        ensemble = Ensemble(simulations=sims, mesh=mesh_object, max_workers=2, status_bar=status)
+
+        solved = ensemble.run()
+        self.assertEqual(solved, [sims[0], sims[1], sims[3]])
+        self.assertEqual(sorted(ensemble.failed), sorted([sims[2].id, sims[4].id]))
+        np.testing.assert_allclose(sims[3].get_result('Depth', 0.0), [3, 6, 9, 12])
+        # the workers receive the metadata of the mesh
+        self.assertEqual((sims[3].xarr.attrs['units'], sims[3].xarr.attrs['zone']), ('feet', 15))
+        self.assertEqual(status.status, 'Solved 5/5 simulations (2 failed)')
+
+    def test_ensemble_run_async(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [1, 2, 3, 4]], [[0, 1, 2], [1, 3, 2]])
+        sims = [ScaledSimulation(factor=f) for f in [1.0, -1.0]]
+        runner = TaskRunner(status_bar=StatusBar())
+        ensemble = Ensemble(simulations=sims, mesh=mesh_object, max_workers=1, runner=runner)
+
+        results = []
+        self.assertTrue(ensemble.run_async(callback=results.append).wait(60))
+        runner.shutdown()
+        self.assertEqual(results, [[sims[0]]])
+        self.assertEqual(list(ensemble.failed), [sims[1].id])
+
+    def test_ensemble_run_async_cancel(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [1, 2, 3, 4]], [[0, 1, 2], [1, 3, 2]])
+        sims = [ScaledSimulation(factor=f) for f in [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]]
+        status = StatusBar()
+        runner = TaskRunner(status_bar=status)
+        ensemble = Ensemble(simulations=sims, mesh=mesh_object, max_workers=1, runner=runner)
+        ensemble.failed = {'previous': RuntimeError()}
+
+        results, tasks = [], []
+        # cancel as soon as the first simulation is reported solved
+        status.param.watch(lambda event: event.new and tasks[0].cancel(), 'progress')
+        tasks.append(ensemble.run_async(callback=results.append))
+        self.assertTrue(tasks[0].wait(60))
+        runner.shutdown()
+
+        # the simulations solved before the cancellation still get their results
+        self.assertEqual(len(results), 1)
+        self.assertTrue(0 < len(results[0]) < len(sims))
+        for sim in results[0]:
+            np.testing.assert_allclose(sim.get_result('Depth', 0.0), sim.factor * np.array([1, 2, 3, 4]))
+        self.assertEqual(ensemble.failed, {})
+        self.assertEqual(status.status, 'Cancelled: Solving 6 simulations ... ')
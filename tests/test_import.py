@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import unittest
+import subprocess
+
+# import time budget of the headless core, in seconds
+IMPORT_BUDGET = 3.0
+
+PLOTTING = ['holoviews', 'geoviews', 'datashader', 'bokeh', 'panel', 'cartopy', 'earthsim']
+
+SCRIPT = """
+import sys, time, json
+blocked = set({blocked})
+
+class Blocker(object):
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] in blocked:
+            raise ImportError('No module named ' + name)
+
+sys.meta_path.insert(0, Blocker())
+start = time.time()
+import genesis.mesh
+elapsed = time.time() - start
+import genesis.store, genesis.ensemble, genesis.projection
+from genesis.mesh import Unstructured2D, Simulation
+import numpy as np, xarray as xr
+
+mesh = Unstructured2D()
+mesh.set_arrays([[0, 1, 0], [0, 0, 1], [1, 2, 3]], [[0, 1, 2]])
+mesh.validate()
+sim = Simulation()
+sim.set_result(xr.Dataset({{'Velocity': (('times', 'nodes_ids', 'vec'), np.ones((2, 3, 2)), {{'BEGVEC': ''}})}},
+                          coords={{'times': [0.0, 1.0]}}, attrs={{'project_name': 'headless'}}))
+print(json.dumps({{'elapsed': elapsed, 'magnitude': sim.get_result('Velocity Magnitude', 1.0).tolist()}}))
+"""
+
+
+class TestImportMain(unittest.TestCase):
+
+    def run_script(self, script):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        output = subprocess.check_output([sys.executable, '-c', script], env=env, cwd=root)
+        return json.loads(output.decode().strip().splitlines()[-1])
+
+    def test_headless_import(self):
+        # the core works with the plotting libraries unavailable, within the import budget
+        result = self.run_script(SCRIPT.format(blocked=PLOTTING))
+        self.assertLess(result['elapsed'], IMPORT_BUDGET)
+        self.assertAlmostEqual(result['magnitude'][0], 2 ** 0.5)
+
+    def test_plotting_not_imported(self):
+        result = self.run_script('import sys, json, genesis.mesh; '
+                                 'print(json.dumps(sorted(m for m in sys.modules if m.split(".")[0] in {})))'
+                                 .format(PLOTTING))
+        self.assertEqual(result, [])
@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+from genesis.instrument import Instrumentation, instrumentation, timed
+from genesis.mesh import Unstructured2D
+from genesis.ui_util.interface import InstrumentationReport
+
+
+class TestInstrumentMain(unittest.TestCase):
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_instrument_disabled(self):
+        collector = Instrumentation()
+        with collector.span('span'):
+            pass
+        collector.count('counter')
+
+        self.assertEqual(collector.report(), {'spans': {}, 'counters': {}, 'snapshots': []})
+
+    def test_instrument_spans(self):
+        collector = Instrumentation()
+        collector.enable(memory=True)
+        for _ in range(3):
+            with collector.span('span'):
+                np.ones(1000)
+        collector.count('counter', 2)
+        collector.snapshot('end')
+        collector.disable()
+        report = collector.report()
+
+        self.assertEqual(report['spans']['span']['count'], 3)
+        self.assertGreaterEqual(report['spans']['span']['max'], report['spans']['span']['mean'])
+        self.assertEqual(report['counters'], {'counter': 2})
+        self.assertEqual(report['snapshots'][0]['label'], 'end')
+        self.assertIn('span', collector.format_report())
+
+    def test_instrument_mesh(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [0, 1, 2, 3]], [[0, 1, 2], [1, 3, 2]])
+        instrumentation.enable()
+        mesh_object.sample([0.25], [0.25])
+        mesh_object.sample([0.25], [0.25])
+
+        self.assertEqual(instrumentation.report()['spans']['mesh.sample']['count'], 2)
+        self.assertEqual(instrumentation.report()['spans']['mesh.element_index']['count'], 1)
+
+    def test_instrument_timed(self):
+        @timed('double')
+        def double(value):
+            return 2 * value
+
+        self.assertEqual(double(2), 4)
+        self.assertNotIn('double', instrumentation.report()['spans'])
+        instrumentation.enable()
+        self.assertEqual(double(2), 4)
+        self.assertEqual(instrumentation.report()['spans']['double']['count'], 1)
+
+    def test_instrument_report_widget(self):
+        widget = InstrumentationReport(enabled=True)
+        self.assertTrue(instrumentation.enabled)
+        with instrumentation.span('span'):
+            pass
+        widget.update()
+        self.assertEqual(list(widget.report['name']), ['span'])
+        widget.clear()
+        self.assertEqual(len(widget.report), 0)
+        widget.enabled = False
+        self.assertFalse(instrumentation.enabled)
@@ -0,0 +1,76 @@
+import threading
+import unittest
+import numpy as np
+import xarray as xr
+from genesis.mesh import Simulation
+from genesis.ui_util.interface import StatusBar, TaskRunner
+
+
+def double(value, started, release, task):
+    started.set()
+    release.wait(5)
+    if task.cancelled:
+        return None
+    task.report(1.0)
+    return 2 * value
+
+
+def fail():
+    raise ValueError('failed to load')
+
+
+class TestInterfaceMain(unittest.TestCase):
+
+    def setUp(self):
+        self.status_bar = StatusBar()
+        self.runner = TaskRunner(status_bar=self.status_bar)
+        self.started, self.release = threading.Event(), threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.runner.shutdown()
+
+    def test_task_runner_callback(self):
+        results = []
+        self.release.set()
+        task = self.runner.submit(double, 21, self.started, self.release, callback=results.append,
+                                  message='Doubling')
+        self.assertTrue(task.wait(5))
+        self.assertEqual(results, [42])
+        self.assertEqual(self.status_bar.status, '')
+
+    def test_task_runner_cancel_and_error(self):
+        results = []
+        task = self.runner.submit(double, 1, self.started, self.release, callback=results.append,
+                                  message='Doubling')
+        self.started.wait(5)
+        self.status_bar.request_cancel()
+        # submitting another task does not clear the cancellation of the first one
+        other = self.runner.submit(double, 2, threading.Event(), self.release, callback=results.append)
+        self.release.set()
+        self.assertTrue(task.wait(5) and other.wait(5))
+        self.assertEqual(results, [4])
+        self.assertTrue(task.cancelled and not other.cancelled)
+
+        # a cancelled task returning partial results hands them to cancel_callback
+        started, release = threading.Event(), threading.Event()
+        partial_results = []
+        task = self.runner.submit(double, 3, started, release, cancel_callback=partial_results.append)
+        started.wait(5)
+        task.cancel()
+        release.set()
+        self.assertTrue(task.wait(5))
+        self.assertEqual(partial_results, [None])
+
+        task = self.runner.submit(fail, message='Loading')
+        self.assertTrue(task.wait(5))
+        self.assertEqual(self.status_bar.status, 'Failed: Loading (failed to load)')
+
+    def test_simulation_load_result(self):
+        sim_object = Simulation()
+        model = xr.Dataset({'Depth': (('times', 'nodes_ids'), np.ones((2, 3)), {'BEGSCL': ''})},
+                           coords={'times': [0.0, 1.0], 'nodes_ids': np.arange(3)}, attrs={'project_name': 'run'})
+        loaded = []
+        self.assertTrue(sim_object.load_result(model, self.runner, callback=loaded.append).wait(5))
+        self.assertEqual(loaded, [sim_object])
+        self.assertEqual((sim_object.sim_name, sim_object.param.time.objects), ('run', [0.0, 1.0]))
@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+import xarray as xr
+from genesis.interpolation import interpolate, bilinear
+from genesis.mesh import Unstructured2D
+
+
+class TestInterpolationMain(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.x, self.y = rng.rand(200) * 10, rng.rand(200) * 10
+        self.values = 2 * self.x + 3 * self.y
+        self.px, self.py = np.array([2.0, 5.0, 7.5, 20.0]), np.array([3.0, 5.0, 6.0, 20.0])
+
+    def test_interpolate_methods(self):
+        # a plane is reproduced exactly by the linear method
+        result = interpolate(self.x, self.y, self.values, self.px, self.py, method='linear', chunk_size=2)
+        np.testing.assert_allclose(result[:3], 2 * self.px[:3] + 3 * self.py[:3])
+        self.assertTrue(np.isnan(result[3]))
+
+        nearest = interpolate(self.x, self.y, self.values, [self.x[5]], [self.y[5]], method='nearest')
+        idw = interpolate(self.x, self.y, self.values, [self.x[5]], [self.y[5]], method='idw')
+        np.testing.assert_allclose([nearest[0], idw[0]], self.values[5])
+        self.assertRaises(RuntimeError, interpolate, self.x, self.y, self.values, self.px, self.py, method='cubic')
+
+    def test_bilinear(self):
+        xc, yc = np.linspace(0, 10, 21), np.linspace(10, 0, 11)
+        raster = 2 * xc[np.newaxis] + 3 * yc[:, np.newaxis]
+        result = bilinear(xc, yc, raster, self.px, self.py, chunk_size=2)
+        np.testing.assert_allclose(result[:3], 2 * self.px[:3] + 3 * self.py[:3])
+        self.assertTrue(np.isnan(result[3]))
+
+    def test_mesh_set_elevation(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([self.px[:3], self.py[:3], np.zeros(3)], [[0, 1, 2]])
+        xc, yc = np.linspace(0, 10, 21), np.linspace(10, 0, 11)
+        raster = xr.DataArray(2 * xc[np.newaxis] + 3 * yc[:, np.newaxis], dims=('y', 'x'), coords={'x': xc, 'y': yc})
+        mesh_object.set_elevation(mesh_object.interpolate_raster(raster))
+
+        np.testing.assert_allclose(mesh_object.coords[2], 2 * self.px[:3] + 3 * self.py[:3])
+        np.testing.assert_allclose(mesh_object.verts['z'], mesh_object.coords[2])
@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+from genesis.lod import cluster_mesh, MeshPyramid
+
+
+def grid_mesh(n):
+    xx, yy = np.meshgrid(np.arange(n, dtype=float), np.arange(n, dtype=float))
+    i = (np.arange(n - 1)[None, :] + n * np.arange(n - 1)[:, None]).ravel()
+    elements = np.vstack([np.column_stack([i, i + 1, i + n]), np.column_stack([i + 1, i + n + 1, i + n])])
+    return xx.ravel(), yy.ravel(), xx.ravel() + yy.ravel(), elements
+
+
+class TestLodMain(unittest.TestCase):
+
+    def test_cluster_mesh(self):
+        x, y, z, elements = grid_mesh(9)
+        cx, cy, cz, coarse = cluster_mesh(x, y, z, elements, cell=2)
+
+        self.assertEqual(len(cx), 25)
+        self.assertEqual(coarse.dtype, np.int32)
+        self.assertTrue(0 < len(coarse) < len(elements))
+        self.assertTrue(coarse.max() < len(cx))
+        # the merged node values are the mean of their members
+        np.testing.assert_allclose(cz, cx + cy)
+
+    def test_pyramid_select(self):
+        x, y, z, elements = grid_mesh(100)
+        pyramid = MeshPyramid(x, y, z, elements, min_elements=1000)
+
+        self.assertTrue(len(pyramid.levels) > 1)
+        self.assertTrue(len(pyramid.levels[-1][4]) <= 1000)
+        # zoomed in at full resolution, zoomed out on the coarsest level
+        self.assertEqual(pyramid.select((0, 10), (0, 10), 400, 400), -1)
+        self.assertEqual(pyramid.select((0, 99), (0, 99), 4, 4), len(pyramid.levels) - 1)
+        self.assertEqual(pyramid.select(None, None, None, None), -1)
@@ -1,8 +1,11 @@
 import unittest
+import numpy as np
+import pandas as pd
+import xarray as xr
 import cartopy.crs as ccrs
 import holoviews.plotting.bokeh
 import geoviews.plotting.bokeh
-from genesis.mesh import Mesh, Unstructured, Unstructured2D
+from genesis.mesh import Mesh, Unstructured, Unstructured2D, Simulation
 
 
 class TestMeshMain(unittest.TestCase):
@@ -30,3 +33,156 @@ class TestMeshMain(unittest.TestCase):
         mesh_object = Unstructured2D(crs=crs)
 
         self.assertIsInstance(mesh_object, Unstructured2D)
+
+    def test_mesh_unstruct2d_arrays(self):
+        verts = pd.DataFrame({'x': [0.0, 1.0, 0.0, 1.0], 'y': [0.0, 0.0, 1.0, 1.0], 'z': [0.0, 1.0, 2.0, 3.0]})
+        tris = pd.DataFrame([[0, 1, 2], [1, 3, 2]], columns=['v0', 'v1', 'v2'])
+        mesh_object = Unstructured2D(verts=verts, tris=tris)
+        mesh_object.validate()
+
+        self.assertEqual(mesh_object.coords.shape, (3, 4))
+        self.assertEqual(mesh_object.elements.dtype, np.int32)
+        # the DataFrames are views of the compact arrays
+        self.assertTrue(np.shares_memory(mesh_object.verts.values, mesh_object.coords))
+        self.assertEqual(len(mesh_object.get_tri_mesh()), 2)
+
+    def test_mesh_unstruct2d_validate(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays(np.zeros((3, 3)), [[0, 1, 3]])
+
+        self.assertRaises(RuntimeError, mesh_object.validate)
+
+    def test_mesh_unstruct2d_topology(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [0, 1, 2, 3]], [[0, 1, 2], [1, 3, 2]])
+        mesh_object.validate()
+
+        np.testing.assert_allclose(mesh_object.element_quality()['min_angle'], [45.0, 45.0])
+        self.assertIs(mesh_object.element_neighbours(), mesh_object.element_neighbours())
+        np.testing.assert_array_equal(mesh_object.boundary_loops()[1], [0, 1, 3, 2])
+        mesh_object.quality_toggle = True
+        self.assertEqual(len(mesh_object.view_quality()[()].data.x), 400)
+
+        # degenerate elements are left out of the aspect ratio map
+        mesh_object.set_arrays([[0, 1, 0, 1, 2], [0, 0, 1, 1, 2], [0, 1, 2, 3, 4]], [[0, 1, 2], [1, 3, 2], [0, 3, 4]])
+        mesh_object.quality_metric = 'aspect_ratio'
+        tri_mesh = mesh_object.view_quality().callback.inputs[0]
+        self.assertTrue(np.isinf(mesh_object.element_quality()['aspect_ratio'][2]))
+        self.assertTrue(np.isnan(tri_mesh.dimension_values('aspect_ratio')[2]))
+        self.assertEqual(len(mesh_object.view_mesh()[()]), 3)
+
+        # a clockwise element overlapping the others
+        mesh_object.set_arrays(mesh_object.coords, [[0, 1, 2], [1, 3, 2], [0, 3, 1]])
+        self.assertRaises(RuntimeError, mesh_object.validate)
+
+    def test_mesh_unstruct2d_projected(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([[500000, 501000, 500000], [4000000, 4000000, 4001000], [1, 2, 3]], [[0, 1, 2]])
+
+        x, y = mesh_object.projected_coords(ccrs.PlateCarree())
+        np.testing.assert_allclose(x[0], -111.0)
+        self.assertIs(mesh_object.projected_coords(ccrs.PlateCarree())[0], x)
+        tri_mesh = mesh_object.get_projected_tri_mesh(ccrs.GOOGLE_MERCATOR)
+        self.assertIs(tri_mesh.crs, ccrs.GOOGLE_MERCATOR)
+        np.testing.assert_allclose(tri_mesh.nodes.dimension_values(0),
+                                   ccrs.GOOGLE_MERCATOR.transform_points(
+                                       ccrs.UTM(12), *mesh_object.coords[:2])[:, 0])
+
+
+def vector_result(num_times=4, num_nodes=6):
+    rng = np.random.RandomState(0)
+    return xr.Dataset(
+        {'Velocity': (('times', 'nodes_ids', 'vec'), rng.rand(num_times, num_nodes, 2), {'BEGVEC': '', 'DIM': 2}),
+         'Depth': (('times', 'nodes_ids'), rng.rand(num_times, num_nodes), {'BEGSCL': ''})},
+        coords={'times': np.arange(num_times, dtype=float), 'nodes_ids': np.arange(num_nodes)},
+        attrs={'project_name': 'test_project'})
+
+
+class TestSimulationMain(unittest.TestCase):
+
+    def test_simulation_set_result(self):
+        result = vector_result()
+        sim_object = Simulation()
+        sim_object.set_result(result)
+
+        self.assertEqual(sim_object.param.result_label.objects, ['Depth', 'Velocity', 'Velocity Magnitude'])
+        self.assertEqual(sim_object.time, 0.0)
+        np.testing.assert_allclose(sim_object.get_result('Velocity Magnitude', 1.0),
+                                   np.hypot(*result['Velocity'].values[1].T))
+
+    def test_simulation_set_result_lazy(self):
+        result = vector_result()
+        sim_object = Simulation(lazy=True)
+        sim_object.set_result(result)
+
+        self.assertIsNotNone(sim_object.xarr['Velocity Magnitude'].chunks)
+        np.testing.assert_allclose(sim_object.get_result('Velocity Magnitude', 2.0),
+                                   np.hypot(*result['Velocity'].values[2].T))
+
+    def test_simulation_append_result(self):
+        result = vector_result(num_times=3)
+        sim_object = Simulation(sim_name='live')
+        sim_object.append_result(result.isel(times=[0]))
+        events = []
+        sim_object.param.watch(events.append, 'time', what='objects')
+        sim_object.append_results(result.isel(times=[t]) for t in range(1, 3))
+
+        self.assertEqual(sim_object.param.time.objects, [0.0, 1.0, 2.0])
+        # one notification of the time objects per append
+        self.assertEqual(len(events), 2)
+        self.assertEqual(sim_object.time, 2.0)
+        np.testing.assert_allclose(sim_object.get_result('Velocity Magnitude', 2.0),
+                                   np.hypot(*result['Velocity'].values[2].T))
+
+    def test_simulation_append_result_graph(self):
+        result = vector_result(num_times=400, num_nodes=3)
+        for lazy in [False, True]:
+            sim_object = Simulation(sim_name='live', lazy=lazy)
+            sim_object.append_results(result.isel(times=[t]) for t in range(200))
+            tasks = len(sim_object.xarr['Velocity Magnitude'].data.__dask_graph__())
+            sim_object.append_results(result.isel(times=[t]) for t in range(200, 400))
+
+            # the graph of the results stays bounded as the number of steps doubles
+            self.assertLess(len(sim_object.xarr['Velocity Magnitude'].data.__dask_graph__()), 1.5 * tasks)
+            self.assertEqual(sim_object.xarr['Depth'].chunks is None, not lazy)
+            np.testing.assert_allclose(sim_object.xarr['Depth'].values, result['Depth'].values)
+            np.testing.assert_allclose(sim_object.get_result('Velocity Magnitude', 300.0),
+                                       np.hypot(*result['Velocity'].values[300].T))
+
+    def test_simulation_probe(self):
+        # two triangles forming the unit square
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [0, 0, 0, 0]], [[0, 1, 2], [1, 3, 2]])
+        result = vector_result(num_times=5, num_nodes=4)
+        sim_object = Simulation()
+        sim_object.set_result(result)
+
+        probe = sim_object.probe(mesh_object, [0.0, 1.0, 2.0], [0.0, 1.0, 2.0], 'Depth', chunk_size=2)
+        self.assertEqual(probe.dims, ('stations', 'times'))
+        np.testing.assert_allclose(probe.values[:2], result['Depth'].values[:, [0, 3]].T)
+        self.assertTrue(np.isnan(probe.values[2]).all())
+
+        probe = sim_object.probe(mesh_object, [1.0], [0.0], 'Velocity Magnitude')
+        np.testing.assert_allclose(probe.values[0], np.hypot(*result['Velocity'].values[:, 1].T))
+
+    def test_simulation_subset(self):
+        # 3x3 grid of nodes split into 8 triangles
+        x, y = [a.ravel() for a in np.meshgrid(np.arange(3.0), np.arange(3.0))]
+        tris = [[a, a + 1, a + 3] for a in [0, 1, 3, 4]] + [[a + 1, a + 4, a + 3] for a in [0, 1, 3, 4]]
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays([x, y, x + y], tris)
+        sub_mesh, node_map = mesh_object.subset([np.array([[-0.5, -0.5], [1.5, -0.5], [1.5, 0.5], [-0.5, 0.5]])])
+
+        np.testing.assert_array_equal(node_map, [0, 1, 2, 3, 4])
+        self.assertEqual(sub_mesh.elements.dtype, np.int32)
+        np.testing.assert_array_equal(sub_mesh.coords, mesh_object.coords[:, node_map])
+        self.assertEqual(len(sub_mesh.elements), 3)
+
+        result = vector_result(num_nodes=9)
+        sim_object = Simulation()
+        sim_object.set_result(result)
+        sub_sim = sim_object.subset(node_map)
+        # contiguous nodes are sliced without copying
+        self.assertTrue(np.shares_memory(sub_sim.xarr['Depth'].values, result['Depth'].values))
+        np.testing.assert_allclose(sub_sim.get_result('Velocity Magnitude', 1.0),
+                                   sim_object.get_result('Velocity Magnitude', 1.0)[node_map])
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from genesis import mesh_io
+from genesis.mesh import Unstructured2D
+
+
+class TestMeshIOMain(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.coords = np.array([[0.0, 1.0, 0.0, 1.0], [0.0, 0.0, 1.0, 1.0], [0.5, 1.5, 2.5, 3.5]])
+        self.elements = np.array([[0, 1, 2], [1, 3, 2]], dtype=np.int32)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_ascii_round_trip(self):
+        path = os.path.join(self.directory, 'mesh.3dm')
+        mesh_io.write_ascii(path, self.coords, self.elements)
+        coords, elements = mesh_io.read_ascii(path)
+
+        np.testing.assert_allclose(coords, self.coords)
+        np.testing.assert_array_equal(elements, self.elements)
+        self.assertEqual(elements.dtype, np.int32)
+
+    def test_ascii_node_ids(self):
+        path = os.path.join(self.directory, 'mesh.2dm')
+        with open(path, 'w') as f:
+            f.write('MESH2D\nE3T 1 10 30 20 1\nND 10 0 0 0\nND 20 0 1 0\nND 30 1 0 0\n')
+        coords, elements = mesh_io.read_ascii(path)
+
+        np.testing.assert_array_equal(elements, [[0, 2, 1]])
+
+    def test_ascii_element_cards(self):
+        path = os.path.join(self.directory, 'mesh.2dm')
+        with open(path, 'w') as f:
+            f.write('MESH2D\nE4Q\t2\t2\t4\t5\t3\t1\nE3T\t1\t1\t2\t3\t1\nND\t1\t0\t0\t0\nND\t2\t1\t0\t0\n'
+                    'ND\t3\t0\t1\t0\nND\t4\t2\t0\t0\nND\t5\t2\t1\t0\n')
+        coords, elements = mesh_io.read_ascii(path)
+
+        # tab separated cards, the quadrilateral split into two triangles after the element before it
+        self.assertEqual(coords.shape, (3, 5))
+        np.testing.assert_array_equal(elements, [[0, 1, 2], [1, 3, 4], [1, 4, 2]])
+
+        with open(path, 'a') as f:
+            f.write('E6T 3 1 2 3 4 5 1 1\n')
+        self.assertRaises(RuntimeError, mesh_io.read_ascii, path)
+
+    def test_mesh_read_cache(self):
+        path = os.path.join(self.directory, 'mesh.3dm')
+        mesh_io.write_ascii(path, self.coords, self.elements)
+        Unstructured2D().read(path)
+        self.assertTrue(os.path.isdir(mesh_io.cache_path(path)))
+
+        mesh_object = Unstructured2D()
+        mesh_object.read(path)
+        # served from the memory-mapped sidecar
+        self.assertFalse(mesh_object.coords.flags.writeable)
+        np.testing.assert_array_equal(mesh_object.elements, self.elements)
+
+    def test_mesh_binary_round_trip(self):
+        path = os.path.join(self.directory, 'mesh.genesis')
+        mesh_object = Unstructured2D(name='binary')
+        mesh_object.set_arrays(self.coords, self.elements)
+        mesh_object.projection.UTM_zone_num = 15
+        mesh_object.write(path)
+
+        result = Unstructured2D()
+        result.read(path)
+        self.assertEqual(result.name, 'binary')
+        self.assertEqual(result.projection.UTM_zone_num, 15)
+        np.testing.assert_array_equal(result.coords, self.coords)
+
+    @unittest.skipIf(os.name == 'nt', 'Windows cannot rename directories of memory-mapped files')
+    def test_mesh_binary_rewrite(self):
+        path = os.path.join(self.directory, 'mesh.genesis')
+        mesh_io.write_binary(path, self.coords, self.elements)
+        mesh_object = Unstructured2D()
+        mesh_object.read(path, mmap=True)
+        # write the memory-mapped arrays back over the files they are mapped from
+        mesh_object.write(path)
+
+        result = Unstructured2D()
+        result.read(path)
+        np.testing.assert_array_equal(result.coords, self.coords)
+        np.testing.assert_array_equal(mesh_object.elements, self.elements)
+        self.assertEqual(os.listdir(self.directory), ['mesh.genesis'])
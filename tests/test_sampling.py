@@ -0,0 +1,29 @@
+import unittest
+import numpy as np
+from genesis.sampling import line_stations, path_stations, sample_grid
+
+
+class TestSamplingMain(unittest.TestCase):
+
+    def test_line_stations(self):
+        xs, ys, distance = line_stations([(0, 0), (3, 0), (3, 4)], resolution=1)
+
+        self.assertEqual(len(xs), 7)
+        np.testing.assert_allclose(distance, np.linspace(0, 7, 7))
+        np.testing.assert_allclose(xs[-1], 3)
+        np.testing.assert_allclose(ys[-1], 4)
+
+    def test_path_stations(self):
+        paths = [np.array([(0, 0), (10, 0)]), np.array([(0, 0), (0, 5)])]
+        xs, ys, distance, offsets = path_stations(paths, resolution=1)
+
+        np.testing.assert_array_equal(offsets, [0, 10, 15])
+        self.assertEqual(len(xs), 15)
+
+    def test_sample_grid(self):
+        xc, yc = np.arange(4.0), np.arange(3.0)
+        values = yc[:, None] * 10 + xc[None, :]
+        xs, ys = np.array([0.4, 1.4, 3.0]), np.array([0.0, 1.6, 2.0])
+
+        np.testing.assert_allclose(sample_grid(xc, yc, values, xs, ys), [0, 21, 23])
+        np.testing.assert_allclose(sample_grid(xc, yc, values, xs, ys, method='linear'), [0.4, 17.4, 23])
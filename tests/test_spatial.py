@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from genesis.spatial import ElementIndex, NodeIndex, points_in_polygon
+from genesis.mesh import Unstructured2D
+
+
+class TestSpatialMain(unittest.TestCase):
+
+    def setUp(self):
+        # two triangles forming the unit square
+        self.x = np.array([0.0, 1.0, 0.0, 1.0])
+        self.y = np.array([0.0, 0.0, 1.0, 1.0])
+        self.tris = np.array([[0, 1, 2], [1, 3, 2]])
+
+    def test_element_index_locate(self):
+        index = ElementIndex(self.x, self.y, self.tris)
+        elements, weights = index.locate([0.2, 0.8, 2.0], [0.2, 0.8, 2.0])
+
+        np.testing.assert_array_equal(elements, [0, 1, -1])
+        np.testing.assert_allclose(weights[0], [0.6, 0.2, 0.2])
+        np.testing.assert_allclose(weights[:2].sum(axis=1), 1)
+
+    def test_element_index_interpolate(self):
+        index = ElementIndex(self.x, self.y, self.tris)
+        values = 2 * self.x + 3 * self.y
+        result = index.interpolate(values, [0.25, 0.9, -1.0], [0.5, 0.3, 0.0])
+
+        np.testing.assert_allclose(result[:2], [2.0, 2.7])
+        self.assertTrue(np.isnan(result[2]))
+
+    def test_node_index_nearest(self):
+        index = NodeIndex(self.x, self.y)
+        nodes, distance = index.nearest([0.1, 0.9], [0.2, 0.8])
+
+        np.testing.assert_array_equal(nodes, [0, 3])
+        np.testing.assert_allclose(distance, np.hypot([0.1, 0.1], [0.2, 0.2]))
+
+    def test_points_in_polygon(self):
+        # concave polygon with a notch cut into its top edge
+        polygon = np.array([[0, 0], [4, 0], [4, 4], [2, 2], [0, 4]], dtype=float)
+        inside = points_in_polygon([1, 2, 2, 5, 3.5], [1, 1, 3, 1, 3.5], polygon)
+        np.testing.assert_array_equal(inside, [True, True, False, False, True])
+
+        index = NodeIndex(self.x, self.y)
+        np.testing.assert_array_equal(index.in_box(-0.5, -0.5, 1.5, 0.5), [0, 1])
+
+    def test_mesh_queries(self):
+        mesh_object = Unstructured2D()
+        mesh_object.set_arrays(np.vstack([self.x, self.y, np.zeros(4)]), self.tris)
+        elements, weights = mesh_object.locate([0.8], [0.8])
+        np.testing.assert_array_equal(elements, [1])
+        np.testing.assert_array_equal(mesh_object.nearest_node([0.9, 0.1], [0.1, 0.9]), [1, 2])
+
+        # the indexes are rebuilt when the mesh changes
+        mesh_object.set_arrays(np.vstack([self.x + 10, self.y, np.zeros(4)]), self.tris)
+        elements, weights = mesh_object.locate([0.8], [0.8])
+        np.testing.assert_array_equal(elements, [-1])
@@ -0,0 +1,40 @@
+import unittest
+import numpy as np
+from genesis.statistics import StreamingHistogram
+from genesis.mesh import Simulation
+from genesis.ui_util.map_display import DisplayRangeOpts
+from tests.test_mesh import vector_result
+
+
+class TestStatisticsMain(unittest.TestCase):
+
+    def test_streaming_histogram(self):
+        values = np.random.RandomState(0).normal(5, 3, 100000)
+        histogram = StreamingHistogram()
+        # sorted chunks force the range to grow repeatedly
+        for chunk in np.array_split(np.sort(values), 20):
+            histogram.update(chunk)
+
+        self.assertEqual(histogram.count, len(values))
+        self.assertEqual((histogram.min, histogram.max), (values.min(), values.max()))
+        np.testing.assert_allclose(histogram.mean, values.mean())
+        np.testing.assert_allclose(histogram.percentile([2, 50, 98]), np.percentile(values, [2, 50, 98]), atol=0.05)
+
+        merged = StreamingHistogram().update(values[:50000]).merge(StreamingHistogram().update(values[50000:]))
+        np.testing.assert_allclose(merged.percentile(50), np.median(values), atol=0.05)
+
+    def test_simulation_display_range(self):
+        result = vector_result(num_times=6, num_nodes=50)
+        display_range = DisplayRangeOpts()
+        sim_object = Simulation(display_range=display_range, time_chunk=2)
+        sim_object.set_result(result)
+        # the results are only read once the range is requested
+        self.assertEqual(sim_object._statistics, {})
+        sim_object.auto_range = True
+
+        depth = result['Depth'].values
+        stats = sim_object.statistics('Depth')
+        self.assertEqual((stats['min'], stats['max']), (depth.min(), depth.max()))
+        self.assertEqual(display_range.param.color_range.bounds, (depth.min(), depth.max()))
+        self.assertEqual(display_range.color_range, (stats['p2'], stats['p98']))
+        self.assertEqual(sim_object.statistics('Depth', time=3.0)['max'], depth[3].max())
@@ -0,0 +1,83 @@
+import gc
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import xarray as xr
+from genesis.mesh import Unstructured2D, Simulation
+from genesis.store import SharedStore
+
+
+class TestStoreMain(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = SharedStore(directory=os.path.join(self.directory, 'store'))
+        self.mesh = Unstructured2D()
+        self.mesh.set_arrays([[0, 1, 0, 1], [0, 0, 1, 1], [1, 2, 3, 4]], [[0, 1, 2], [1, 3, 2]])
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_acquire_mesh(self):
+        path = os.path.join(self.directory, 'mesh.2dm')
+        self.mesh.write(path)
+        first, second = self.store.acquire_mesh(path), self.store.acquire_mesh(path)
+
+        self.assertTrue(np.shares_memory(first.coords, second.coords))
+        self.assertFalse(first.coords.flags.writeable)
+        # derived data is shared, a modified mesh gets private arrays
+        first.element_index()
+        self.assertIn('element_index', second._cache)
+        second.set_elevation(np.zeros(4))
+        np.testing.assert_array_equal(first.coords[2], [1, 2, 3, 4])
+
+        self.store.release(first)
+        self.assertEqual(len(self.store), 1)
+        self.store.release(second)
+        self.assertEqual(len(self.store), 0)
+
+    @unittest.skipIf(os.name == 'nt', 'Windows cannot rename directories of memory-mapped files')
+    def test_acquire_mesh_refresh(self):
+        path = os.path.join(self.directory, 'mesh.2dm')
+        self.mesh.write(path)
+        first = self.store.acquire_mesh(path)
+        # a new version of the source file refreshes the sidecar mapped by first
+        self.mesh.set_elevation(np.zeros(4))
+        self.mesh.write(path)
+        os.utime(path, (0, 0))
+        second = self.store.acquire_mesh(path)
+
+        np.testing.assert_array_equal(first.coords[2], [1, 2, 3, 4])
+        np.testing.assert_array_equal(second.coords[2], [0, 0, 0, 0])
+        self.assertFalse(second.coords.flags.writeable)
+
+    def test_share_mesh_and_result(self):
+        shared = self.store.share_mesh(self.mesh)
+        self.assertTrue(np.shares_memory(shared.coords, self.store.share_mesh(self.mesh).coords))
+        np.testing.assert_array_equal(shared.elements, self.mesh.elements)
+
+        path = os.path.join(self.directory, 'result.nc')
+        xr.Dataset({'Depth': (('times', 'nodes_ids'), np.random.rand(3, 4))}).to_netcdf(path)
+        first, second = self.store.acquire_result(path), self.store.acquire_result(path)
+        first['Elevation'] = first['Depth'] * 2
+        self.assertNotIn('Elevation', second)
+        self.store.release(first)
+        self.store.release(second)
+
+    def test_acquire_result_simulation(self):
+        path = os.path.join(self.directory, 'result.nc')
+        xr.Dataset({'Depth': (('times', 'nodes_ids'), np.random.rand(3, 4))}, coords={'times': [0.0, 1.0, 2.0]},
+                   attrs={'project_name': 'run'}).to_netcdf(path)
+        sim_object = Simulation(lazy=True, time_chunk=1)
+        sim_object.set_result(self.store.acquire_result(path, chunks={'times': 1}))
+        gc.collect()
+        # the simulation holds the reference although set_result rechunked the acquired dataset
+        self.assertEqual(len(self.store), 1)
+        other = self.store.acquire_result(path, chunks={'times': 1})
+        self.assertEqual(len(self.store), 1)
+
+        del sim_object, other
+        gc.collect()
+        self.assertEqual(len(self.store), 0)
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+from genesis.topology import (unique_edges, edge_lines, node_elements, node_neighbours, element_neighbours,
+                              boundary_loops, element_quality, topology_problems)
+
+
+class TestTopologyMain(unittest.TestCase):
+
+    def setUp(self):
+        # two triangles forming the unit square
+        self.x = np.array([0.0, 1.0, 0.0, 1.0])
+        self.y = np.array([0.0, 0.0, 1.0, 1.0])
+        self.tris = np.array([[0, 1, 2], [1, 3, 2]])
+
+    def test_unique_edges(self):
+        edges, boundary = unique_edges(self.tris)
+
+        np.testing.assert_array_equal(edges, [[0, 1], [0, 2], [1, 2], [1, 3], [2, 3]])
+        np.testing.assert_array_equal(boundary, [True, True, False, True, True])
+        self.assertEqual(edges.dtype, np.int32)
+
+    def test_edge_lines(self):
+        xs, ys = edge_lines(self.x, self.y, np.array([[0, 3], [1, 2]]))
+
+        np.testing.assert_array_equal(xs, [0, 1, np.nan, 1, 0, np.nan])
+        np.testing.assert_array_equal(ys, [0, 1, np.nan, 0, 1, np.nan])
+
+    def test_node_adjacency(self):
+        offsets, elements = node_elements(self.tris, 4)
+
+        np.testing.assert_array_equal(offsets, [0, 1, 3, 5, 6])
+        np.testing.assert_array_equal(elements, [0, 0, 1, 0, 1, 1])
+        offsets, nodes = node_neighbours(unique_edges(self.tris)[0], 4)
+        np.testing.assert_array_equal(nodes[offsets[1]:offsets[2]], [0, 2, 3])
+
+    def test_element_neighbours(self):
+        neighbours = element_neighbours(self.tris)
+
+        np.testing.assert_array_equal(neighbours, [[-1, 1, -1], [-1, -1, 0]])
+        # a third element on the shared edge makes it non-manifold
+        neighbours = element_neighbours(np.vstack([self.tris, [[1, 2, 0]]]))
+        self.assertEqual(neighbours[0, 1], -2)
+
+    def test_boundary_loops(self):
+        # 5x5 grid of nodes with the elements around the center node removed
+        cells = [r * 5 + c for r in range(4) for c in range(4)]
+        tris = np.array([[a, a + 1, a + 5] for a in cells] + [[a + 1, a + 6, a + 5] for a in cells])
+        tris = tris[(tris != 12).all(axis=1)]
+        offsets, nodes = boundary_loops(tris, element_neighbours(tris))
+
+        self.assertEqual(len(offsets), 3)
+        loops = [nodes[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+        loops = [list(np.roll(loop, -np.argmin(loop))) for loop in loops]
+        # counter-clockwise outer boundary and clockwise hole
+        self.assertEqual(loops[0], [0, 1, 2, 3, 4, 9, 14, 19, 24, 23, 22, 21, 20, 15, 10, 5])
+        self.assertEqual(loops[1], [7, 11, 16, 17, 13, 8])
+
+    def test_element_quality(self):
+        x = np.array([0.0, 1.0, 0.5])
+        y = np.array([0.0, 0.0, np.sqrt(3) / 2])
+        area, aspect_ratio, min_angle = element_quality(x, y, np.array([[0, 1, 2], [0, 2, 1], [0, 0, 1]]))
+
+        np.testing.assert_allclose(area[:2], [np.sqrt(3) / 4, -np.sqrt(3) / 4])
+        np.testing.assert_allclose(aspect_ratio, [1.0, 1.0, np.inf])
+        np.testing.assert_allclose(min_angle, [60.0, 60.0, 0.0])
+
+    def test_topology_problems(self):
+        tris = np.vstack([self.tris, [[0, 2, 1], [0, 0, 1]]])
+        area, aspect_ratio = element_quality(self.x, self.y, tris)[:2]
+        problems = topology_problems(tris, 5, element_neighbours(tris), area, aspect_ratio)
+
+        self.assertEqual(problems, {'degenerate_elements': 1, 'duplicate_elements': 0, 'non_manifold_elements': 4,
+                                    'inverted_elements': 1, 'unused_nodes': 1})
+
+    def test_topology_problems_collinear(self):
+        # collinear nodes whose computed area is not exactly zero
+        x, y = np.array([0.1, 0.7, 0.3]), np.array([0.3, 2.1, 0.9])
+        tris = np.array([[0, 1, 2]])
+        area, aspect_ratio, min_angle = element_quality(x, y, tris)
+        problems = topology_problems(tris, 3, element_neighbours(tris), area, aspect_ratio)
+
+        self.assertNotEqual(area[0], 0)
+        self.assertEqual((aspect_ratio[0], min_angle[0]), (np.inf, 0.0))
+        self.assertEqual((problems['degenerate_elements'], problems['inverted_elements']), (1, 0))